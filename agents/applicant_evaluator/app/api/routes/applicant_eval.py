@@ -1,7 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
+import asyncio
 import uuid
 from io import BytesIO
 import json
@@ -13,6 +15,7 @@ from ...schemas.applicant_profile import (
     Consistency,
     Provenance,
 )
+from ...config import settings
 from ...services import (
     storage,
     nlp,
@@ -22,6 +25,7 @@ from ...services import (
     score_client,        # manith
     recommender_client,  # thenura
     llm_service,
+    explanations,
 )
 try:
     import PyPDF2
@@ -55,6 +59,11 @@ class FormPayload(BaseModel):
     bank_asset_value: float | None = None
 
 
+class OutcomePayload(BaseModel):
+    loan_id: str
+    final_outcome: Literal["Approved", "Rejected"]
+
+
 # helper
 def _normalize_for_models(feat: dict) -> dict:
     out = dict(feat)
@@ -96,6 +105,37 @@ def _normalize_for_models(feat: dict) -> dict:
     return out
 
 
+async def _call_downstream(applicant_id: str, loan_id: str, feature_dict: dict) -> tuple[dict, dict]:
+    """
+    Calls the score and recommendation agents.
+    Both requests go out together unless the recommender needs the score's "approved" flag,
+    in which case the score is awaited first (sequential mode).
+    """
+    cfg = settings()
+    score_features = _normalize_for_models(feature_dict)
+    rec_features = _normalize_for_models(feature_dict)
+
+    async def _recommend(rec_input: dict) -> dict:
+        return await recommender_client.send_applicant_input(
+            applicant_id=applicant_id,
+            loan_id=loan_id,
+            applicant_input=rec_input,
+        ) or {}
+
+    if cfg.ORCHESTRATION_MODE == "concurrent" and not cfg.RECOMMENDER_NEEDS_SCORE:
+        scored, recommendation = await asyncio.gather(
+            score_client.score(score_features),
+            _recommend(rec_features),
+        )
+        return scored or {}, recommendation
+
+    scored = await score_client.score(score_features) or {}
+    prediction = scored.get("prediction", "Rejected")
+    approved = str(prediction).lower() == "approved"
+    recommendation = await _recommend({**rec_features, "approved": approved})
+    return scored, recommendation
+
+
 @router.post("/", response_model=dict)
 def create_applicant():
     applicant_id = str(uuid.uuid4())
@@ -157,22 +197,9 @@ async def evaluate_with_form(applicant_id: str, payload: FormPayload, request: R
     order = feature_vector.FEATURE_ORDER
     vec = feature_vector.to_vector(feats, order)
 
-    # SCORE AGENT (SEND NORMALIZED DICT)
+    # SCORE + RECOMMENDATION AGENTS (SEND NORMALIZED DICT)
     feature_dict = feature_vector.feats_to_dict(feats)
-    score_features = _normalize_for_models(feature_dict)
-    scored = score_client.score(score_features) or {}
-
-    # RECOMMENDATION AGENT (also normalized)
-    rec_features = _normalize_for_models(feature_dict)
-    prediction = scored.get("prediction", "Rejected")
-    approved = str(prediction).lower() == "approved"
-    rec_input = {**rec_features, "approved": approved}
-
-    recommendation = recommender_client.send_applicant_input(
-        applicant_id=applicant_id,
-        loan_id=payload.loan_id,
-        applicant_input=rec_input,
-    ) or {}
+    scored, recommendation = await _call_downstream(applicant_id, payload.loan_id, feature_dict)
 
     # persist + respond
     data = profile.model_dump()
@@ -181,11 +208,32 @@ async def evaluate_with_form(applicant_id: str, payload: FormPayload, request: R
     # data["vector"] = vec
     # data["vector_order"] = order
 
-    storage.save_profile(applicant_id, payload.loan_id, data)
-    
-    
     # LLM Explanation
-    prompt = f"""
+    prompt = _explanation_prompt(data)
+    cache_key = llm_service.explanation_key(data.get("features", {}), scored, recommendation)
+
+    if settings().LLM_EXPLANATION_MODE == "deferred":
+        # respond now; the explanation streams from the job and is persisted next to the profile
+        job = explanations.start(applicant_id, payload.loan_id, prompt, cache_key=cache_key)
+        base = f"{router.prefix}/{applicant_id}/explanations/{job.job_id}"
+        data["llm_explanation"] = None
+        data["explanation_job"] = {
+            "job_id": job.job_id,
+            "status": job.status,
+            "stream_url": f"{base}/stream?loan_id={payload.loan_id}",
+            "result_url": f"{base}?loan_id={payload.loan_id}",
+        }
+        storage.save_profile(applicant_id, payload.loan_id, data)
+        return data
+
+    storage.save_profile(applicant_id, payload.loan_id, data)
+    llm_response = await llm_service.query_llm(prompt, cache_key=cache_key)
+    data["llm_explanation"] = llm_response
+    return data
+
+
+def _explanation_prompt(data: dict) -> str:
+    return f"""
     You are a financial advisor AI.
     Given this applicant's full evaluation data:
     
@@ -201,9 +249,53 @@ async def evaluate_with_form(applicant_id: str, payload: FormPayload, request: R
     - 3 personalized improvement tips for the applicant
     Provide the explanation in a friendly and encouraging tone.
     """
-    llm_response = llm_service.query_llm(prompt)
-    data["llm_explanation"] = llm_response
-    return data
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@router.get("/{applicant_id}/explanations/{job_id}", response_model=dict)
+def get_explanation(applicant_id: str, job_id: str, loan_id: Optional[str] = None):
+    """Current state of a deferred explanation; finished jobs are read back from storage via loan_id."""
+    job = explanations.get(job_id)
+    if job is not None and job.applicant_id == applicant_id:
+        return job.to_dict()
+    if loan_id:
+        stored = storage.load_explanation(applicant_id, loan_id)
+        if stored and stored.get("job_id") == job_id:
+            return stored
+    raise HTTPException(status_code=404, detail="explanation not found")
+
+
+@router.get("/{applicant_id}/explanations/{job_id}/stream")
+async def stream_explanation(applicant_id: str, job_id: str, loan_id: Optional[str] = None):
+    """
+    Server-Sent Events: one "token" event per generated token, then "done" (or "error") with the full text.
+    Jobs live in the worker that ran the evaluation; elsewhere a finished explanation is replayed from storage.
+    """
+    job = explanations.get(job_id)
+    if job is None or job.applicant_id != applicant_id:
+        stored = storage.load_explanation(applicant_id, loan_id) if loan_id else None
+        if not stored or stored.get("job_id") != job_id:
+            raise HTTPException(status_code=404, detail="explanation not found")
+
+        async def replay():
+            yield _sse("token", {"token": stored.get("text", "")})
+            yield _sse(stored.get("status", "done"), stored)
+
+        return StreamingResponse(replay(), media_type="text/event-stream")
+
+    async def events():
+        async for token in job.follow():
+            yield _sse("token", {"token": token})
+        yield _sse(job.status, job.to_dict())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{applicant_id}/profile", response_model=dict)
@@ -214,6 +306,17 @@ def get_profile(applicant_id: str, loan_id: str):
     return data
 
 
+@router.post("/{applicant_id}/outcome", response_model=dict)
+def record_outcome(applicant_id: str, payload: OutcomePayload):
+    """Final decision on an evaluated loan; labeled profiles feed the score models' incremental updates."""
+    recorded_at = datetime.utcnow().isoformat() + "Z"
+    data = storage.save_outcome(applicant_id, payload.loan_id, payload.final_outcome, recorded_at)
+    if not data:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return {"applicant_id": applicant_id, "loan_id": payload.loan_id,
+            "final_outcome": payload.final_outcome, "outcome_recorded_at": recorded_at}
+
+
 # Prefill endpoints
 @router.post("/{applicant_id}/prefill-from-text", response_model=dict)
 async def prefill_from_text(applicant_id: str, payload: dict):
@@ -16,6 +16,28 @@ class Settings(BaseSettings):
     RECOMMENDER_URL: str = "http://localhost:8200/api/v1/recommend"
     CORS_ALLOW_ORIGINS: List[str] = ["*"]
 
+    # "concurrent": score + recommendation requested together, "sequential": score first
+    ORCHESTRATION_MODE: str = "concurrent"
+    # set when the recommender starts using the score agent's "approved" flag;
+    # forces the sequential path because the recommendation then depends on the score
+    RECOMMENDER_NEEDS_SCORE: bool = False
+
+    # "inline": wait for the LLM before responding, "deferred": respond with an explanation job id
+    # and stream the explanation over SSE from /{applicant_id}/explanations/{job_id}/stream
+    LLM_EXPLANATION_MODE: str = "inline"
+
+    # explanation cache (0 items disables it); disk tier lives under STORAGE_DIR/_llm_cache
+    LLM_CACHE_MAX_ITEMS: int = 1024
+    LLM_CACHE_TTL_S: float = 24 * 3600
+    LLM_CACHE_DISK: bool = False
+    LLM_CACHE_ROUND_SIG: int = 4
+
+    # shared async HTTP pool for score / recommender / LLM calls
+    HTTP_MAX_CONNECTIONS: int = 200
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_TIMEOUT: float = 30.0
+
     class Config:
         env_file = _find_env()
         extra = "ignore"
@@ -1,12 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 # from app.api.routes.applicant_eval import router as applicant_eval_router
 from .api.routes.applicant_eval import router as applicant_eval_router
 from .config import settings  
-from .services import extractor
+from .services import extractor, http_client, llm_service
 
 
-app = FastAPI(title="Applicant Evaluator (NLP + Rules)", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # pooled HTTP client lives for the whole worker, closed on shutdown
+    await http_client.startup()
+    yield
+    await http_client.shutdown()
+
+
+app = FastAPI(title="Applicant Evaluator (NLP + Rules)", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,4 +33,5 @@ def live():
         "status": "ok",
         "score_agent_url": settings().SCORE_AGENT_URL,
         "storage_dir": settings().STORAGE_DIR,
+        "llm_cache": llm_service.cache_stats(),
     }
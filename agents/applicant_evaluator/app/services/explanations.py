@@ -0,0 +1,113 @@
+# Deferred LLM explanations: generated in the background, streamed to clients, persisted next to the profile
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from . import llm_service, storage
+
+MAX_JOBS = 1000  # finished jobs kept in memory; older ones are served from storage
+
+
+class ExplanationJob:
+    def __init__(self, applicant_id: str, loan_id: str):
+        self.job_id = str(uuid.uuid4())
+        self.applicant_id = applicant_id
+        self.loan_id = loan_id
+        self.status = "pending"  # pending | running | done | error
+        self.tokens: list[str] = []
+        self.error: str | None = None
+        self._updated = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in {"done", "error"}
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens).strip()
+
+    def _notify(self):
+        # wake every follower, then arm a fresh event for the next update
+        event, self._updated = self._updated, asyncio.Event()
+        event.set()
+
+    def append(self, token: str):
+        self.tokens.append(token)
+        self._notify()
+
+    def finish(self, status: str, error: str | None = None):
+        self.status = status
+        self.error = error
+        self._notify()
+
+    async def follow(self):
+        """Yields every token produced so far, then new ones as they arrive, until the job ends."""
+        i = 0
+        while True:
+            while i < len(self.tokens):
+                yield self.tokens[i]
+                i += 1
+            if self.done:
+                return
+            await self._updated.wait()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "applicant_id": self.applicant_id,
+            "loan_id": self.loan_id,
+            "status": self.status,
+            "text": self.text,
+            "error": self.error,
+        }
+
+
+_jobs: "OrderedDict[str, ExplanationJob]" = OrderedDict()
+_tasks: set = set()  # strong refs so running tasks are not garbage collected
+
+
+def _evict():
+    while len(_jobs) > MAX_JOBS:
+        oldest_id = next((jid for jid, j in _jobs.items() if j.done), None)
+        if oldest_id is None:
+            return
+        _jobs.pop(oldest_id)
+
+
+async def _run(job: ExplanationJob, prompt: str, cache_key: str | None):
+    job.status = "running"
+    cached = llm_service.cached_explanation(cache_key)
+    if cached is not None:
+        job.append(cached)
+        job.finish("done")
+    else:
+        try:
+            async for token in llm_service.stream_llm(prompt):
+                job.append(token)
+            job.finish("done")
+            llm_service.remember_explanation(cache_key, job.text)
+        except Exception as e:
+            # appended, not reassigned: followers index into job.tokens and keep what was streamed
+            job.append(("\n\n" if job.tokens else "") + f"LLM unavailable: {e}")
+            job.finish("error", str(e))
+
+    payload = {**job.to_dict(), "completed_at": datetime.utcnow().isoformat() + "Z"}
+    try:
+        storage.save_explanation(job.applicant_id, job.loan_id, payload)
+    except Exception as e:
+        print("explanation persist error:", e)
+
+
+def start(applicant_id: str, loan_id: str, prompt: str, cache_key: str | None = None) -> ExplanationJob:
+    job = ExplanationJob(applicant_id, loan_id)
+    _jobs[job.job_id] = job
+    _evict()
+    task = asyncio.create_task(_run(job, prompt, cache_key))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def get(job_id: str) -> ExplanationJob | None:
+    return _jobs.get(job_id)
@@ -0,0 +1,36 @@
+import httpx
+from ..config import settings
+
+# one pooled client per worker process, shared by every downstream call
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    cfg = settings()
+    limits = httpx.Limits(
+        max_connections=cfg.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=cfg.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=cfg.HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=cfg.HTTP_TIMEOUT)
+
+
+async def startup():
+    global _client
+    if _client is None:
+        _client = _build_client()
+
+
+async def shutdown():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the shared client; created lazily when the app lifespan did not run (scripts, tests)."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
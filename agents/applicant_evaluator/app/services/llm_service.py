@@ -1,21 +1,194 @@
-import requests
+import hashlib
 import json
+import math
+import os
+import time
+from collections import OrderedDict
+
+from ..config import settings
+from .http_client import get_client
 
 OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "llama3" 
 
-def query_llm(prompt: str) -> str:
+
+class ExplanationCache:
+    """
+    LRU + TTL cache for LLM explanations, with an optional on-disk tier
+    (one JSON file per key) that survives restarts and is shared by workers.
+    """
+
+    def __init__(self, max_items: int, ttl_s: float, disk_dir: str | None = None):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.disk_dir = disk_dir
+        self._items: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_s > 0 and time.time() - created_at > self.ttl_s
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _remember(self, key: str, created_at: float, text: str):
+        self._items[key] = (created_at, text)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> str | None:
+        entry = self._items.get(key)
+        if entry is not None:
+            created_at, text = entry
+            if not self._expired(created_at):
+                self._items.move_to_end(key)
+                self.hits += 1
+                return text
+            del self._items[key]
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                if not self._expired(stored["created_at"]):
+                    self._remember(key, stored["created_at"], stored["text"])
+                    self.disk_hits += 1
+                    return stored["text"]
+                os.remove(self._disk_path(key))
+            except (OSError, ValueError, KeyError):
+                pass
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, text: str):
+        created_at = time.time()
+        self._remember(key, created_at, text)
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "w", encoding="utf-8") as f:
+                    json.dump({"created_at": created_at, "text": text}, f, ensure_ascii=False)
+            except OSError as e:
+                print("explanation cache write error:", e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_items": self.max_items,
+            "ttl_s": self.ttl_s,
+            "disk": bool(self.disk_dir),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: ExplanationCache | None = None
+
+
+def get_cache() -> ExplanationCache | None:
+    global _cache
+    cfg = settings()
+    if cfg.LLM_CACHE_MAX_ITEMS <= 0:
+        return None
+    if _cache is None:
+        disk_dir = os.path.join(cfg.STORAGE_DIR, "_llm_cache") if cfg.LLM_CACHE_DISK else None
+        _cache = ExplanationCache(cfg.LLM_CACHE_MAX_ITEMS, cfg.LLM_CACHE_TTL_S, disk_dir)
+    return _cache
+
+
+def cache_stats() -> dict:
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+def _round_sig(value, digits: int):
+    # rounds numbers to significant digits so tiny form edits map to the same key
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(float(value), digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def explanation_key(features: dict, inference: dict, recommendation: dict) -> str:
+    """Canonical hash of the rounded features, the predicted outcome and the risk level."""
+    digits = settings().LLM_CACHE_ROUND_SIG
+    canonical = {
+        "model": MODEL,
+        "features": {k: _round_sig(v, digits) for k, v in sorted((features or {}).items())},
+        "prediction": (inference or {}).get("prediction"),
+        "risk_level": (recommendation or {}).get("risk_level"),
+    }
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def cached_explanation(cache_key: str | None) -> str | None:
+    cache = get_cache()
+    if cache is None or not cache_key:
+        return None
+    return cache.get(cache_key)
+
+
+def remember_explanation(cache_key: str | None, text: str):
+    cache = get_cache()
+    if cache is None or not cache_key or not text:
+        return
+    cache.put(cache_key, text)
+
+
+async def query_llm(prompt: str, cache_key: str | None = None) -> str:
     """
     Send a prompt to the Ollama model and return the generated text.
+    When cache_key is given, a cached explanation is returned without calling the model.
     """
+    cached = cached_explanation(cache_key)
+    if cached is not None:
+        return cached
     try:
-        response = requests.post(
+        response = await get_client().post(
             OLLAMA_URL,
             json={"model": MODEL, "prompt": prompt, "stream": False},
             timeout=30
         )
         response.raise_for_status()
         data = response.json()
-        return data.get("response", "").strip()
+        text = data.get("response", "").strip()
     except Exception as e:
         return f"LLM unavailable: {e}"
+    remember_explanation(cache_key, text)
+    return text
+
+
+async def stream_llm(prompt: str):
+    """
+    Stream the Ollama generation token by token (stream: true sends one JSON object per line).
+    Raises on transport errors so the caller can record the failure.
+    """
+    async with get_client().stream(
+        "POST",
+        OLLAMA_URL,
+        json={"model": MODEL, "prompt": prompt, "stream": True},
+        timeout=30,
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            token = chunk.get("response", "")
+            if token:
+                yield token
+            if chunk.get("done"):
+                break
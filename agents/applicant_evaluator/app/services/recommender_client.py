@@ -1,7 +1,7 @@
-import requests
 from ..config import settings
+from .http_client import get_client
 
-def send_applicant_input(applicant_id: str, loan_id: str, applicant_input: dict) -> dict:
+async def send_applicant_input(applicant_id: str, loan_id: str, applicant_input: dict) -> dict:
     url = getattr(settings(), "RECOMMENDER_URL", None)
     if not url:
         return {"error": "RECOMMENDER_URL not set"}
@@ -11,7 +11,7 @@ def send_applicant_input(applicant_id: str, loan_id: str, applicant_input: dict)
         "applicant_input": applicant_input,
     }
     try:
-        r = requests.post(url, json=payload, timeout=15)
+        r = await get_client().post(url, json=payload, timeout=15)
         r.raise_for_status()
         return r.json()
     except Exception as e:
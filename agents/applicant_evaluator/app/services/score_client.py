@@ -1,9 +1,9 @@
-import requests
 from ..config import settings
+from .http_client import get_client
   
-def score(features: dict) -> dict:
+async def score(features: dict) -> dict:
     try:
-        r = requests.post(settings().SCORE_AGENT_URL, json=features, timeout=10)
+        r = await get_client().post(settings().SCORE_AGENT_URL, json=features, timeout=10)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -49,3 +49,28 @@ def load_profile(applicant_id: str, loan_id: str):
         return None
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
+
+def save_outcome(applicant_id: str, loan_id: str, outcome: str, recorded_at: str):
+    """Records the final decision on a stored profile (the label the score models learn from); None if no profile."""
+    data = load_profile(applicant_id, loan_id)
+    if data is None:
+        return None
+    data["final_outcome"] = outcome
+    data["outcome_recorded_at"] = recorded_at
+    save_profile(applicant_id, loan_id, data)
+    return data
+
+def _explanation_path(applicant_id: str, loan_id: str) -> str:
+    return os.path.join(_root(applicant_id), "profiles", f"{loan_id}.explanation.json")
+
+def save_explanation(applicant_id: str, loan_id: str, payload: dict):
+    ensure_bucket(applicant_id)
+    with open(_explanation_path(applicant_id, loan_id), "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+def load_explanation(applicant_id: str, loan_id: str):
+    path = _explanation_path(applicant_id, loan_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -1,11 +1,20 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from .predict import recommend
+import codecs
+import json
+import os
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from .predict import recommend, recommend_many
 from dotenv import load_dotenv
 load_dotenv()
 
 app = FastAPI(title="Recommendation Agent")
 
+# rows per vectorized predict call in /recommend/batch (bounds memory for large inputs)
+BATCH_CHUNK = int(os.getenv("RECOMMENDER_BATCH_CHUNK", "1000"))
+
 class RecommendPayload(BaseModel):
     applicant_id: str
     loan_id: str
@@ -16,3 +25,186 @@ def recommend_endpoint(p: RecommendPayload):
     approved = bool(p.applicant_input.get("approved", False))
     features = {k: v for k, v in p.applicant_input.items() if k != "approved"}
     return recommend(features, approved=approved)
+
+
+def _recommend_chunk(items: list) -> str:
+    """[(index, raw payload)] -> NDJSON lines, one per payload (errors reported per row)."""
+    rows, out = [], {}
+    for index, raw in items:
+        try:
+            p = RecommendPayload(**raw) if isinstance(raw, dict) else RecommendPayload.model_validate(raw)
+        except (ValidationError, TypeError) as e:
+            out[index] = {"index": index, "error": f"invalid payload: {e.errors() if isinstance(e, ValidationError) else e}"}
+            continue
+        features = {k: v for k, v in p.applicant_input.items() if k != "approved"}
+        rows.append((index, p, features))
+
+    try:
+        results = recommend_many([f for _, _, f in rows]) if rows else []
+    except Exception:
+        # one bad row must not fail the whole chunk: redo it row by row
+        results = []
+        for _, _, f in rows:
+            try:
+                results.append(recommend_many([f])[0])
+            except Exception as e:
+                results.append({"error": str(e)})
+
+    for (index, p, _), result in zip(rows, results):
+        out[index] = {"index": index, "applicant_id": p.applicant_id, "loan_id": p.loan_id, **result}
+    return "".join(json.dumps(out[i]) + "\n" for i, _ in items)
+
+
+async def _ndjson_items(chunks):
+    # splits the body into lines as it arrives, so a large NDJSON upload is never held at once
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buf.strip():
+        yield buf
+
+
+async def _stream_results(items):
+    chunk = []
+    index = 0
+    async for item in items:
+        if isinstance(item, bytes):
+            try:
+                item = json.loads(item)
+            except ValueError as e:
+                item = e
+        if isinstance(item, Exception):
+            # malformed NDJSON line: answered in order with an error row
+            if chunk:
+                yield await run_in_threadpool(_recommend_chunk, chunk)
+                chunk = []
+            yield json.dumps({"index": index, "error": f"invalid JSON: {item}"}) + "\n"
+        else:
+            chunk.append((index, item))
+        index += 1
+        if len(chunk) >= BATCH_CHUNK:
+            yield await run_in_threadpool(_recommend_chunk, chunk)
+            chunk = []
+    if chunk:
+        yield await run_in_threadpool(_recommend_chunk, chunk)
+
+
+async def _json_array_items(chunks):
+    # parses a JSON array element by element as the body arrives, so it is never held whole
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, state, eof = "", "open", False
+    while True:
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buf):
+                break
+            if state == "open":
+                if buf[pos] != "[":
+                    yield ValueError("expected a JSON array")
+                    return
+                state, pos = "first", pos + 1
+            elif state == "sep":
+                if buf[pos] == "]":
+                    return
+                if buf[pos] != ",":
+                    yield ValueError(f"expected ',' or ']', got {buf[pos]!r}")
+                    return
+                state, pos = "value", pos + 1
+            elif state == "first" and buf[pos] == "]":
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError as e:
+                    if eof:
+                        yield e
+                        return
+                    break  # element not complete yet
+                if end == len(buf) and not eof:
+                    break  # a number or literal may continue in the next chunk
+                yield item
+                state, pos = "sep", end
+        if eof:
+            yield ValueError("unterminated JSON array")
+            return
+        buf = buf[pos:]
+        try:
+            buf += utf8.decode(await chunks.__anext__())
+        except StopAsyncIteration:
+            buf += utf8.decode(b"", final=True)
+            eof = True
+        except UnicodeDecodeError as e:
+            yield e
+            return
+
+
+async def _prepend(head: bytes, chunks):
+    yield head
+    async for chunk in chunks:
+        yield chunk
+
+
+async def _iterate(values):
+    for v in values:
+        yield v
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    # The results are produced while the request body is still being read. Starlette's
+    # StreamingResponse listens for the disconnect on the same receive channel and would swallow
+    # the remaining body messages, so this one only streams; a client that goes away mid-upload
+    # still surfaces as ClientDisconnect from request.stream().
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/api/v1/recommend/batch")
+async def recommend_batch_endpoint(request: Request):
+    """
+    Body: a JSON array of RecommendPayload objects, or NDJSON (one payload per line,
+    Content-Type: application/x-ndjson). Response: NDJSON, one line per input in input order
+    with cluster, risk_level and recommendations (or an error for that row).
+
+    Arrays and NDJSON are read, scored and answered BATCH_CHUNK rows at a time, so memory stays
+    flat and the first lines go out before the upload ends. A JSON object body (a single payload
+    or {"items": [...]}) is read whole.
+    """
+    content_type = request.headers.get("content-type", "")
+    chunks = request.stream().__aiter__()
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return _BodyStreamingResponse(_stream_results(_ndjson_items(chunks)),
+                                      media_type="application/x-ndjson")
+
+    # only the first bytes are checked before the 200 goes out; later errors are error rows
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+    head = head.lstrip()
+    if head.startswith(b"["):
+        items = _json_array_items(_prepend(head, chunks))
+        return _BodyStreamingResponse(_stream_results(items), media_type="application/x-ndjson")
+    if not head.startswith(b"{"):
+        raise HTTPException(status_code=400, detail="expected a JSON array or NDJSON of payloads")
+
+    async for chunk in chunks:
+        head += chunk
+    try:
+        data = json.loads(head)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"invalid JSON body: {e}")
+    if isinstance(data, dict):
+        data = data.get("items", [data])
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="expected a JSON array or NDJSON of payloads")
+    return StreamingResponse(_stream_results(_iterate(data)), media_type="application/x-ndjson")
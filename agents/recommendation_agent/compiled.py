@@ -0,0 +1,171 @@
+"""
+Compiled nearest-centroid inference for the risk clustering pipeline.
+
+KMeans.predict on the ColumnTransformer output is argmin_k ||z - c_k||^2 with
+z = [(x - mean) / scale, one-hot]. Both parts are folded into precomputed tables:
+
+  numeric:  ((x - mean) / scale - c) = (x - center_raw) / scale,  center_raw = mean + scale * c
+  one-hot:  sum_p (e_code - c_p)^2 = sum_p c_p^2 - 2 c_code + 1     (unknown category: sum_p c_p^2)
+
+so a batch is one broadcasted distance over the engineered numeric columns plus a table lookup
+per categorical column, with no DataFrame or sklearn call in between.
+
+train.py checks the compiled path against the pipeline on the whole training CSV (check_csv) and
+stores the result in models/manifest.json; serving workers only re-check the first PROBE_ROWS rows.
+
+    python -m agents.recommendation_agent.compiled      # check against the pipeline on the training CSV
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+TRAINING_CSV = "data/raw/loan_approval_dataset.csv"
+PROBE_ROWS = 256
+
+
+class CompiledRiskClusterer:
+    def __init__(self, builder, num_columns, centers_raw, inv_scale, cat_columns, cat_lookups, cat_costs):
+        self.builder = builder              # fitted RiskFeatureBuilder (feature engineering + imputation)
+        self.num_columns = list(num_columns)
+        self.centers_raw = centers_raw      # (k, n_num): centroids in engineered-feature space
+        self.inv_scale = inv_scale          # (n_num,)
+        self.cat_columns = list(cat_columns)
+        self.cat_lookups = cat_lookups      # [{category: code}] per categorical column
+        self.cat_costs = cat_costs          # [(k, n_categories + 1)]; last column = unknown category
+        self.n_clusters = centers_raw.shape[0]
+
+    @classmethod
+    def from_pipeline(cls, pipe):
+        """Builds the tables from a fitted feats -> ColumnTransformer -> KMeans pipeline."""
+        builder, prep, kmeans = pipe.named_steps["feats"], pipe.named_steps["prep"], pipe.named_steps["kmeans"]
+        centers = np.asarray(kmeans.cluster_centers_, dtype=float)
+        offset = 0
+        num_columns, centers_raw, inv_scale = [], [], []
+        cat_columns, cat_lookups, cat_costs = [], [], []
+
+        for name, trans, cols in prep.transformers_:
+            if isinstance(trans, str):
+                if trans == "drop":
+                    continue
+                raise NotImplementedError(f"cannot compile '{trans}' columns")
+            cols = list(cols)
+            if not cols:
+                continue
+            kind = type(trans).__name__
+            if kind == "StandardScaler":
+                n = len(cols)
+                mean = trans.mean_ if trans.with_mean else np.zeros(n)
+                scale = trans.scale_ if trans.with_std else np.ones(n)
+                num_columns += cols
+                centers_raw.append(mean + scale * centers[:, offset:offset + n])
+                inv_scale.append(1.0 / scale)
+                offset += n
+            elif kind == "OneHotEncoder":
+                if trans.drop is not None or trans.handle_unknown != "ignore":
+                    raise NotImplementedError("OneHotEncoder with drop/handle_unknown!='ignore' is not compiled")
+                for col, cats in zip(cols, trans.categories_):
+                    c = centers[:, offset:offset + len(cats)]
+                    sq = (c ** 2).sum(axis=1, keepdims=True)
+                    cat_columns.append(col)
+                    cat_lookups.append({cat: code for code, cat in enumerate(cats.tolist())})
+                    cat_costs.append(np.hstack([sq - 2 * c + 1, sq]))
+                    offset += len(cats)
+            else:
+                raise NotImplementedError(f"cannot compile transformer {kind}")
+
+        if offset != centers.shape[1]:
+            raise NotImplementedError("ColumnTransformer output does not line up with the KMeans centers")
+        return cls(builder, num_columns, np.hstack(centers_raw), np.concatenate(inv_scale),
+                   cat_columns, cat_lookups, cat_costs)
+
+    def _assign(self, features: dict) -> np.ndarray:
+        X = np.column_stack([features[c] for c in self.num_columns])
+        d = (((X[:, None, :] - self.centers_raw[None, :, :]) * self.inv_scale) ** 2).sum(axis=2)
+        for col, lookup, costs in zip(self.cat_columns, self.cat_lookups, self.cat_costs):
+            unknown = costs.shape[1] - 1
+            codes = np.fromiter((lookup.get(v, unknown) for v in features[col]), dtype=int, count=len(X))
+            d += costs[:, codes].T
+        return np.argmin(d, axis=1)
+
+    def predict_records(self, records: list) -> np.ndarray:
+        """Applicant dicts -> cluster ids (no DataFrame)."""
+        return self._assign(self.builder.transform_records(records))
+
+    def predict(self, X) -> np.ndarray:
+        """DataFrame (same input as Pipeline.predict) -> cluster ids."""
+        return self._assign(self.builder.transform_columns(X))
+
+
+def compile_pipeline(pipe) -> CompiledRiskClusterer:
+    return CompiledRiskClusterer.from_pipeline(pipe)
+
+
+def verify(compiled: CompiledRiskClusterer, pipe, df) -> int:
+    """Rows where the compiled path and Pipeline.predict disagree; raises AssertionError on any."""
+    expected = pipe.predict(df)
+    got = compiled.predict(df)
+    mismatches = int(np.sum(expected != got))
+    if mismatches:
+        raise AssertionError(f"compiled clusterer disagrees with the pipeline on {mismatches}/{len(df)} rows")
+    records = df.head(64).to_dict(orient="records")
+    if not np.array_equal(compiled.predict_records(records), expected[:len(records)]):
+        raise AssertionError("compiled clusterer record path disagrees with the pipeline")
+    return mismatches
+
+
+def check_csv(compiled: CompiledRiskClusterer, pipe, csv_path: str, chunksize: int = 100_000) -> dict:
+    """Compares the compiled path with Pipeline.predict on every row of csv_path, chunk by chunk."""
+    import pandas as pd
+
+    rows = mismatches = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        chunk.columns = chunk.columns.str.strip()
+        expected = pipe.predict(chunk)
+        mismatches += int(np.sum(compiled.predict(chunk) != expected))
+        if rows == 0:
+            records = chunk.head(64).to_dict(orient="records")
+            mismatches += int(np.sum(compiled.predict_records(records) != expected[:len(records)]))
+        rows += len(chunk)
+    return {
+        "dataset": str(csv_path),
+        "rows": rows,
+        "mismatches": mismatches,
+        "checked_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def main():
+    import time
+
+    import pandas as pd
+
+    from agents.recommendation_agent.manifest import read_manifest, write_manifest
+    from agents.recommendation_agent.predict import CLUSTER_MAP_PATH, PIPE
+
+    compiled = compile_pipeline(PIPE)
+    check = check_csv(compiled, PIPE, TRAINING_CSV)
+    if check["mismatches"]:
+        raise SystemExit(f"compiled clusterer disagrees with the pipeline on {check['mismatches']} rows")
+    print(f"compiled clusterer matches the pipeline on all {check['rows']} training rows")
+    models_dir = CLUSTER_MAP_PATH.parent
+    if read_manifest(models_dir) is not None:
+        write_manifest(models_dir, compiled_check=check)
+
+    df = pd.read_csv(TRAINING_CSV)
+    df.columns = df.columns.str.strip()
+
+    records = df.to_dict(orient="records")
+    for label, fn in [("pipeline, 1 row", lambda: PIPE.predict(df.iloc[[0]])),
+                      ("compiled, 1 row", lambda: compiled.predict_records(records[:1])),
+                      ("pipeline, all rows", lambda: PIPE.predict(df)),
+                      ("compiled, all rows", lambda: compiled.predict(df))]:
+        start = time.perf_counter()
+        for _ in range(20):
+            fn()
+        print(f"{label}: {(time.perf_counter() - start) / 20 * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import warnings
+
 import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
@@ -12,58 +14,128 @@ RAW_NUM = [
 ]
 RAW_CAT = ["education","self_employed"]
 
+# money columns: clipped at 0 and log1p'd
+MONEY = ["income_annum","loan_amount",
+         "residential_assets_value","commercial_assets_value",
+         "luxury_assets_value","bank_asset_value"]
+ENGINEERED = ["loan_to_income","dti","emi","monthly_income",
+              "log_income_annum","log_loan_amount",
+              "log_residential_assets_value","log_commercial_assets_value",
+              "log_luxury_assets_value","log_bank_asset_value"]
+# column order of transform() output (same as the original DataFrame version)
+OUTPUT_COLUMNS = RAW_NUM + RAW_CAT + ["loan_to_income","emi","monthly_income","dti"] + [f"log_{c}" for c in MONEY]
+
+
+def emi(principal, term_months, rate: float = MONTHLY_RATE) -> np.ndarray:
+    """Closed-form EMI for arrays of principals and whole-month terms (0 for principal <= 0)."""
+    principal = np.asarray(principal, dtype=float)
+    pow_ = (1 + rate) ** np.asarray(term_months, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = principal * rate * pow_ / (pow_ - 1)
+    return np.where(principal > 0, out, 0.0)
+
+
+def _median(values: np.ndarray) -> np.ndarray:
+    # column medians ignoring NaN; an all-NaN column stays NaN (as pandas' median does)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmedian(values, axis=0)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
 class RiskFeatureBuilder(BaseEstimator, TransformerMixin):
+    """
+    Raw applicant columns -> cleaned raw columns + engineered risk features (loan_to_income, emi,
+    dti, logs), all computed column-wise in NumPy. fit() learns the imputation medians so a
+    single live row is imputed with training statistics; pipelines pickled before that (no
+    fitted medians) keep imputing from the batch they are given.
+    """
+
     def fit(self, X, y=None):
+        num, _ = self._columns(X)
+        self.raw_medians_ = _median(num)
+        eng = self._engineer(self._impute(num, self.raw_medians_))
+        self.eng_medians_ = _median(np.column_stack([eng[c] for c in ENGINEERED]))
         return self
 
     def transform(self, X):
-        df = X.copy()
-        df.columns = df.columns.str.strip()
+        return pd.DataFrame(self.transform_columns(X), columns=OUTPUT_COLUMNS, index=getattr(X, "index", None))
+
+    def transform_columns(self, X) -> dict:
+        """Same features as transform(), as {feature: array} (no output DataFrame)."""
+        num, cat = self._columns(X)
+        col = self._build(num)
+        col.update(zip(RAW_CAT, cat))
+        return col
+
+    def transform_one(self, record: dict) -> dict:
+        """Lightweight single-row path (no pandas): applicant dict -> {feature: value}."""
+        col = self.transform_records([record])
+        return {c: (float(v[0]) if c not in RAW_CAT else v[0]) for c, v in col.items()}
+
+    def transform_records(self, records: list) -> dict:
+        """Applicant dicts -> {feature: array} without building a DataFrame."""
+        num = np.empty((len(records), len(RAW_NUM)))
+        cat = [np.empty(len(records), dtype=object) for _ in RAW_CAT]
+        for r, record in enumerate(records):
+            clean = {str(k).strip(): v for k, v in record.items()}
+            missing = [c for c in RAW_NUM + RAW_CAT if c not in clean]
+            if missing:
+                raise ValueError(f"Missing required columns: {missing}")
+            num[r] = [_to_float(clean[c]) for c in RAW_NUM]
+            for values, c in zip(cat, RAW_CAT):
+                values[r] = "Unknown" if clean[c] is None else clean[c]
+        col = self._build(num)
+        col.update(zip(RAW_CAT, cat))
+        return col
+
+    # -- internals --
+
+    def _columns(self, X):
+        df = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+        cols = {str(c).strip(): c for c in df.columns}
         needed = RAW_NUM + RAW_CAT
-        missing = [c for c in needed if c not in df.columns]
+        missing = [c for c in needed if c not in cols]
         if missing:
             raise ValueError(f"Missing required columns: {missing}")
-        df = df[needed].copy()
+        num = np.column_stack([pd.to_numeric(df[cols[c]], errors="coerce").to_numpy(dtype=float) for c in RAW_NUM])
+        cat = [df[cols[c]].fillna("Unknown").to_numpy(dtype=object) for c in RAW_CAT]
+        return num, cat
 
-        # numerics -> numeric + impute
-        df[RAW_NUM] = df[RAW_NUM].apply(pd.to_numeric, errors="coerce")
-        df[RAW_NUM] = df[RAW_NUM].fillna(df[RAW_NUM].median(numeric_only=True))
+    @staticmethod
+    def _impute(num: np.ndarray, medians: np.ndarray) -> np.ndarray:
+        return np.where(np.isnan(num), medians, num)
 
+    @staticmethod
+    def _engineer(num: np.ndarray) -> dict:
+        col = {c: num[:, i] for i, c in enumerate(RAW_NUM)}
         # guards
-        df["loan_term"] = df["loan_term"].clip(lower=1)  # years
-        for col in ["income_annum","loan_amount",
-                    "residential_assets_value","commercial_assets_value",
-                    "luxury_assets_value","bank_asset_value"]:
-            df[col] = df[col].clip(lower=0)
-
-        # categoricals
-        for c in RAW_CAT:
-            if df[c].isna().any():
-                df[c] = df[c].fillna("Unknown")
-
-        # engineered features
-        df["loan_to_income"] = df["loan_amount"] / (df["income_annum"] + 1e-6)
-
-        def compute_emi(p, r, n):
-            if p <= 0 or n <= 0:
-                return 0.0
-            pow_ = (1 + r) ** n
-            return p * r * pow_ / (pow_ - 1)
-
-        term_months = (df["loan_term"] * 12).astype(int).clip(lower=1)
-        df["emi"] = [compute_emi(p, MONTHLY_RATE, n) for p, n in zip(df["loan_amount"].values, term_months.values)]
-        df["monthly_income"] = df["income_annum"] / 12.0
-        df["dti"] = df["emi"] / (df["monthly_income"] + 1e-6)
-
-        for col in ["income_annum","loan_amount",
-                    "residential_assets_value","commercial_assets_value",
-                    "luxury_assets_value","bank_asset_value"]:
-            df[f"log_{col}"] = np.log1p(df[col].clip(lower=0))
-
-        eng = ["loan_to_income","dti","emi","monthly_income",
-               "log_income_annum","log_loan_amount",
-               "log_residential_assets_value","log_commercial_assets_value",
-               "log_luxury_assets_value","log_bank_asset_value"]
-        df[eng] = df[eng].replace([np.inf, -np.inf], np.nan)
-        df[eng] = df[eng].fillna(df[eng].median(numeric_only=True))
-        return df
+        col["loan_term"] = np.maximum(col["loan_term"], 1)  # years
+        for c in MONEY:
+            col[c] = np.maximum(col[c], 0)
+
+        col["loan_to_income"] = col["loan_amount"] / (col["income_annum"] + 1e-6)
+        with np.errstate(invalid="ignore"):
+            term_months = np.maximum(np.trunc(col["loan_term"] * 12), 1)
+        col["emi"] = emi(col["loan_amount"], term_months)
+        col["monthly_income"] = col["income_annum"] / 12.0
+        col["dti"] = col["emi"] / (col["monthly_income"] + 1e-6)
+        for c in MONEY:
+            col[f"log_{c}"] = np.log1p(col[c])
+        return col
+
+    def _build(self, num: np.ndarray) -> dict:
+        fitted = hasattr(self, "raw_medians_")
+        col = self._engineer(self._impute(num, self.raw_medians_ if fitted else _median(num)))
+        eng = np.column_stack([col[c] for c in ENGINEERED])
+        eng[~np.isfinite(eng)] = np.nan
+        eng = self._impute(eng, self.eng_medians_ if fitted else _median(eng))
+        for i, c in enumerate(ENGINEERED):
+            col[c] = eng[:, i]
+        return col
@@ -0,0 +1,88 @@
+"""
+Artifact manifest for the recommendation agent.
+
+train.py writes models/manifest.json next to the artifacts it saves:
+
+    {"created_at": "2026-10-17T17:50:00+00:00",
+     "files": {"pipeline": {"path": "risk_cluster_pipeline.joblib", "sha256": "..."},
+               "cluster_to_risk": {"path": "cluster_to_risk.json", "sha256": "..."},
+               "recommendations": {"path": "recommendations.json", "sha256": "..."}},
+     "compiled_check": {"dataset": "...", "rows": 4269, "mismatches": 0, "checked_at": "..."}}
+
+Paths are relative to the manifest's folder, so the folder can be mounted anywhere. predict.py
+opens this one file instead of searching the tree for the pipeline. compiled_check is the result
+of checking the compiled clusterer against the pipeline on the whole training CSV (done once at
+training time, so workers do not repeat it at startup).
+
+    python -m agents.recommendation_agent.manifest [models_dir]    # (re)write it for existing artifacts
+"""
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+MANIFEST_FILE = "manifest.json"
+MODEL_FILENAME = "risk_cluster_pipeline.joblib"
+CLUSTER_JSON = "cluster_to_risk.json"
+RECS_JSON = "recommendations.json"
+ARTIFACTS = {"pipeline": MODEL_FILENAME, "cluster_to_risk": CLUSTER_JSON, "recommendations": RECS_JSON}
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_manifest(models_dir, compiled_check: dict | None = None) -> dict:
+    models_dir = Path(models_dir)
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "files": {kind: {"path": filename, "sha256": _sha256(models_dir / filename)}
+                  for kind, filename in ARTIFACTS.items()},
+    }
+    if compiled_check is None:
+        # rewriting the manifest for the same pipeline keeps its check
+        previous = read_manifest(models_dir)
+        if previous and previous["files"]["pipeline"]["sha256"] == manifest["files"]["pipeline"]["sha256"]:
+            compiled_check = previous.get("compiled_check")
+    if compiled_check is not None:
+        manifest["compiled_check"] = compiled_check
+    # written then renamed, so a worker starting mid-training never reads half a manifest
+    tmp_path = models_dir / f"{MANIFEST_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, models_dir / MANIFEST_FILE)
+    return manifest
+
+
+def read_manifest(models_dir) -> dict | None:
+    """The manifest in models_dir, or None when there is none."""
+    path = Path(models_dir) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def manifest_paths(manifest: dict, models_dir) -> dict:
+    return {kind: Path(models_dir) / entry["path"] for kind, entry in manifest["files"].items()}
+
+
+def verify_manifest(manifest: dict, models_dir):
+    """Raises ValueError when an artifact is missing or no longer matches its recorded hash."""
+    for kind, path in manifest_paths(manifest, models_dir).items():
+        if not path.exists():
+            raise ValueError(f"{kind}: {path} is missing")
+        if _sha256(path) != manifest["files"][kind]["sha256"]:
+            raise ValueError(f"{kind}: {path} does not match its manifest hash")
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "models"
+    write_manifest(target)
+    print(f"Wrote {Path(target) / MANIFEST_FILE}")
@@ -2,9 +2,13 @@ from __future__ import annotations
 from pathlib import Path
 import os, json, sys
 import joblib
+import numpy as np
 import pandas as pd
 
 from agents.recommendation_agent.features import RiskFeatureBuilder  # noqa: F401
+from agents.recommendation_agent.manifest import (
+    CLUSTER_JSON, MODEL_FILENAME, RECS_JSON, manifest_paths, read_manifest, verify_manifest,
+)
 import types
 main_mod = sys.modules.get("__main__")
 if main_mod is None:
@@ -21,25 +25,55 @@ CANDIDATE_DIRS = [
     REPO_ROOT / "agents" / "score_agent" / "models",  
 ]
 
-MODEL_FILENAME = "risk_cluster_pipeline.joblib"
-CLUSTER_JSON = "cluster_to_risk.json"
-RECS_JSON = "recommendations.json"
+# joblib memory-maps the numpy arrays inside the (uncompressed) pipeline pickle, so the
+# scaler statistics and centroids are shared between workers; RECOMMENDER_MMAP_MODE="" turns it off
+MMAP_MODE = os.getenv("RECOMMENDER_MMAP_MODE", "r") or None
+
+# Walking the whole repo (node_modules, data volumes) for the pipeline costs seconds per worker
+# start, so it only happens when asked for: RECOMMENDER_MODEL_SCAN=1
+MODEL_SCAN = os.getenv("RECOMMENDER_MODEL_SCAN", "0") == "1"
 
 def _light_validate(pipe) -> bool:
     """Accept if the object has a predict()."""
     return hasattr(pipe, "predict")
 
-def _try_load(dir_path: Path):
-    mp = dir_path / MODEL_FILENAME
-    if not mp.exists():
-        return None
+def _load_pipe(mp: Path):
     try:
-        pipe = joblib.load(mp)
+        pipe = joblib.load(mp, mmap_mode=MMAP_MODE)
     except Exception:
         return None
     if not _light_validate(pipe):
         return None
-    return pipe, dir_path / CLUSTER_JSON, dir_path / RECS_JSON
+    return pipe
+
+def _try_manifest(dir_path: Path):
+    """Loads the artifacts listed in dir_path/manifest.json (written by train.py)."""
+    try:
+        manifest = read_manifest(dir_path)
+        if manifest is None:
+            return None
+        verify_manifest(manifest, dir_path)
+    except Exception as e:
+        print(f"Ignoring manifest in {dir_path}: {e}")
+        return None
+    paths = manifest_paths(manifest, dir_path)
+    pipe = _load_pipe(paths["pipeline"])
+    if pipe is None:
+        return None
+    return pipe, paths["cluster_to_risk"], paths["recommendations"], manifest
+
+def _try_load(dir_path: Path):
+    out = _try_manifest(dir_path)
+    if out:
+        return out
+    # folders trained before the manifest existed
+    mp = dir_path / MODEL_FILENAME
+    if not mp.exists():
+        return None
+    pipe = _load_pipe(mp)
+    if pipe is None:
+        return None
+    return pipe, dir_path / CLUSTER_JSON, dir_path / RECS_JSON, None
 
 def _resolve_model():
     # Mannual override
@@ -55,19 +89,21 @@ def _resolve_model():
         if out:
             return out
 
-    # recursive search from repo root
-    for mp in REPO_ROOT.rglob(MODEL_FILENAME):
-        out = _try_load(mp.parent)
-        if out:
-            return out
+    # recursive search from repo root (opt-in)
+    if MODEL_SCAN:
+        for mp in REPO_ROOT.rglob(MODEL_FILENAME):
+            out = _try_load(mp.parent)
+            if out:
+                return out
 
     tried = ", ".join(str(p) for p in CANDIDATE_DIRS)
+    scanned = f" and recursive search under {REPO_ROOT}" if MODEL_SCAN else ""
     raise FileNotFoundError(
-        f"Could not load {MODEL_FILENAME}. Tried: {tried} and recursive search under {REPO_ROOT}.\n"
-        "Set RECOMMENDER_MODEL_DIR to the correct folder if needed."
+        f"Could not load {MODEL_FILENAME}. Tried: {tried}{scanned}.\n"
+        "Set RECOMMENDER_MODEL_DIR to the correct folder, or RECOMMENDER_MODEL_SCAN=1 to search the repo."
     )
 
-PIPE, CLUSTER_MAP_PATH, RECS_PATH = _resolve_model()
+PIPE, CLUSTER_MAP_PATH, RECS_PATH, MANIFEST = _resolve_model()
 
 if not CLUSTER_MAP_PATH.exists():
     raise FileNotFoundError(f"Missing {CLUSTER_JSON} next to model at: {CLUSTER_MAP_PATH}")
@@ -79,6 +115,36 @@ with CLUSTER_MAP_PATH.open() as f:
 with RECS_PATH.open() as f:
     RECS = json.load(f)
 
+# Compiled nearest-centroid path (RECOMMENDER_INFERENCE=pipeline keeps DataFrame + Pipeline.predict).
+# train.py checks it against the pipeline on the whole training CSV and records the result in the
+# manifest; a worker only re-checks the first PROBE_ROWS rows. Any mismatch disables it.
+COMPILED = None
+if os.getenv("RECOMMENDER_INFERENCE", "compiled") == "compiled":
+    try:
+        from agents.recommendation_agent.compiled import PROBE_ROWS, TRAINING_CSV, compile_pipeline, verify
+        check = (MANIFEST or {}).get("compiled_check")
+        if check is not None and check["mismatches"]:
+            raise AssertionError(f"it disagreed with the pipeline on {check['mismatches']} of "
+                                 f"{check['rows']} training rows")
+        COMPILED = compile_pipeline(PIPE)
+        verify_csv = Path(os.getenv("RECOMMENDER_VERIFY_CSV", str(REPO_ROOT / TRAINING_CSV)))
+        if verify_csv.exists():
+            verify_df = pd.read_csv(verify_csv, nrows=PROBE_ROWS)
+            verify_df.columns = verify_df.columns.str.strip()
+            verify(COMPILED, PIPE, verify_df)
+        elif check is None:
+            print(f"{verify_csv} not found, compiled clusterer not checked against the training data")
+    except Exception as e:
+        print(f"Compiled clusterer disabled, using the pipeline: {e}")
+        COMPILED = None
+
+
+def predict_clusters(applicants: list):
+    """Cluster id per applicant dict, in one vectorized call."""
+    if COMPILED is not None:
+        return COMPILED.predict_records(applicants)
+    return PIPE.predict(pd.DataFrame(applicants))
+
 def rule_override(app: dict) -> str | None:
     income = float(app.get("income_annum", 0))
     loan   = float(app.get("loan_amount", 0))
@@ -96,9 +162,23 @@ def rule_override(app: dict) -> str | None:
     if (cibil > 720 and (loan / (income + 1e-6) < 0.5 and dti < 0.25)): return "Low Risk"
     return None
 
+def rule_override_batch(apps: list) -> list:
+    """rule_override for many applicants at once (same thresholds, numpy arrays)."""
+    income = np.array([float(a.get("income_annum", 0)) for a in apps])
+    loan = np.array([float(a.get("loan_amount", 0)) for a in apps])
+    cibil = np.array([float(a.get("cibil_score", 0)) for a in apps])
+    n = np.maximum(np.array([int(float(a.get("loan_term", 1)) * 12) for a in apps]), 1)
+    r = 0.12 / 12
+    pow_ = (1 + r) ** n
+    emi = np.where(loan > 0, loan * r * pow_ / (pow_ - 1), 0.0)
+    dti = emi / (income / 12.0 + 1e-6)
+    lti = loan / (income + 1e-6)
+    high = (cibil < 600) & ((lti > 3) | (dti > 0.6))
+    low = (cibil > 720) & (lti < 0.5) & (dti < 0.25)
+    return ["High Risk" if h else "Low Risk" if l else None for h, l in zip(high, low)]
+
 def predict_and_recommend(applicant: dict) -> dict:
-    row = pd.DataFrame([applicant])
-    cluster = int(PIPE.predict(row)[0])
+    cluster = int(predict_clusters([applicant])[0])
     risk = CLUSTER_TO_RISK.get(str(cluster), f"Cluster {cluster}")
     override = rule_override(applicant)
     if override is not None:
@@ -109,3 +189,14 @@ def predict_and_recommend(applicant: dict) -> dict:
 def recommend(features: dict, approved: bool = False) -> dict:
     return predict_and_recommend(features)
 
+def recommend_many(applicants: list) -> list:
+    """predict_and_recommend for a batch: one vectorized cluster assignment + rule pass."""
+    clusters = predict_clusters(applicants)
+    overrides = rule_override_batch(applicants)
+    out = []
+    for cluster, override in zip(clusters, overrides):
+        cluster = int(cluster)
+        risk = override if override is not None else CLUSTER_TO_RISK.get(str(cluster), f"Cluster {cluster}")
+        out.append({"cluster": cluster, "risk_level": risk, "recommendations": RECS[risk]})
+    return out
+
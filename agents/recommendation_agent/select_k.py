@@ -0,0 +1,167 @@
+"""
+Cluster-count selection for the risk clustering model.
+
+    python -m agents.recommendation_agent.select_k --k 2-10 [--sample 10000] [--workers 4]
+
+The engineered + scaled feature matrix (what the clusterer sees in train.py --stream) is built once,
+chunk by chunk with the builder and scaler of train.fit_streaming_preprocessor, straight into a
+memory-mapped data/cache/risk_features-<hash>.npy keyed by the CSV contents and the feature list.
+Every k is fitted in its own process on the memory-mapped matrix, and scored on the same fixed
+random sample of rows: exact silhouette is O(n^2), so it (and Calinski-Harabasz, for a like for
+like comparison) only ever sees `sample` rows. The compact report goes to models/k_selection.json.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+CACHE_DIR = "data/cache"
+REPORT_PATH = "models/k_selection.json"
+SAMPLE_ROWS = 10_000
+# above this many rows a k is fitted with MiniBatchKMeans instead of full KMeans
+FULL_KMEANS_ROWS = 200_000
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def feature_matrix(csv_path: str, cache_dir: str = CACHE_DIR, chunksize: int = 100_000, seed: int = 42) -> str:
+    """Path of the cached model-input matrix for csv_path (built on the first call, one chunk in memory at a time)."""
+    from agents.recommendation_agent.train import (
+        CAT_FEATURES, NUM_FEATURES, RESERVOIR_ROWS, _chunks, fit_streaming_preprocessor, streaming_features,
+    )
+
+    spec = json.dumps([NUM_FEATURES, CAT_FEATURES, "stream", RESERVOIR_ROWS, seed])
+    key = hashlib.sha256((_sha256(csv_path) + spec).encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"risk_features-{key}.npy")
+    if os.path.exists(path):
+        print(f"Using cached feature matrix {path}")
+        return path
+
+    start = time.perf_counter()
+    builder, prep, sample, n_rows = fit_streaming_preprocessor(csv_path, chunksize, seed)
+    n_features = prep.transform(streaming_features(builder, sample.head(1))).shape[1]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    X = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=(n_rows, n_features))
+    offset = 0
+    for chunk in _chunks(csv_path, chunksize):
+        X[offset:offset + len(chunk)] = prep.transform(streaming_features(builder, chunk))
+        offset += len(chunk)
+    X.flush()
+    del X
+    os.replace(tmp_path, path)
+    print(f"Built feature matrix ({n_rows}, {n_features}) in {time.perf_counter() - start:.1f}s -> {path}")
+    return path
+
+
+def _limit_threads():
+    # one process per k already fills the cores; nested OpenMP/BLAS threads would oversubscribe them
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+
+def _sample_rows(n: int, sample: int, seed: int) -> np.ndarray:
+    if n <= sample:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=sample, replace=False))
+
+
+def evaluate_k(matrix_path: str, k: int, sample: int = SAMPLE_ROWS, seed: int = 42) -> dict:
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.metrics import calinski_harabasz_score, silhouette_score
+
+    X = np.load(matrix_path, mmap_mode="r")
+    start = time.perf_counter()
+    if len(X) > FULL_KMEANS_ROWS:
+        model = MiniBatchKMeans(n_clusters=k, random_state=seed, batch_size=4096, n_init=3).fit(X)
+    else:
+        model = KMeans(n_clusters=k, random_state=seed, n_init=10).fit(X)
+    fit_s = time.perf_counter() - start
+
+    rows = _sample_rows(len(X), sample, seed)
+    X_s = np.asarray(X[rows])
+    labels_s = model.predict(X_s)
+    sizes = np.bincount(model.predict(X) if len(X) > FULL_KMEANS_ROWS else model.labels_, minlength=k)
+    return {
+        "k": k,
+        "silhouette": round(float(silhouette_score(X_s, labels_s)), 4) if len(set(labels_s)) > 1 else None,
+        "calinski_harabasz": round(float(calinski_harabasz_score(X_s, labels_s)), 2) if len(set(labels_s)) > 1 else None,
+        "inertia": round(float(model.inertia_), 2),
+        "smallest_cluster_share": round(float(sizes.min() / sizes.sum()), 4),
+        "fit_s": round(fit_s, 2),
+    }
+
+
+def sweep(csv_path: str, ks: list, sample: int = SAMPLE_ROWS, workers: int | None = None, seed: int = 42,
+          cache_dir: str = CACHE_DIR, chunksize: int = 100_000) -> dict:
+    matrix_path = feature_matrix(csv_path, cache_dir, chunksize, seed)
+    n_rows, n_features = np.load(matrix_path, mmap_mode="r").shape
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or min(len(ks), os.cpu_count() or 1),
+                             initializer=_limit_threads) as pool:
+        results = list(pool.map(evaluate_k, [matrix_path] * len(ks), ks, [sample] * len(ks), [seed] * len(ks)))
+
+    scored = [r for r in results if r["silhouette"] is not None]
+    best = max(scored, key=lambda r: (r["silhouette"], r["calinski_harabasz"]))["k"] if scored else None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "dataset": csv_path,
+        "feature_matrix": matrix_path,
+        "rows": int(n_rows),
+        "features": int(n_features),
+        "sample_rows": int(min(sample, n_rows)),
+        "seed": seed,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+        "best_k_by_silhouette": best,
+        "results": results,
+    }
+
+
+def _parse_ks(spec: str) -> list:
+    if "-" in spec:
+        lo, hi = spec.split("-", 1)
+        return list(range(int(lo), int(hi) + 1))
+    return [int(k) for k in spec.split(",")]
+
+
+def main():
+    from agents.recommendation_agent.train import DATA_CSV
+
+    parser = argparse.ArgumentParser(description="Pick the cluster count for the risk clustering model")
+    parser.add_argument("--csv", default=DATA_CSV)
+    parser.add_argument("--k", default="2-10", help="range (2-10) or list (3,4,6)")
+    parser.add_argument("--sample", type=int, default=SAMPLE_ROWS, help="rows scored per k")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--chunksize", type=int, default=100_000, help="CSV rows per chunk when building the matrix")
+    parser.add_argument("--out", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    report = sweep(args.csv, _parse_ks(args.k), args.sample, args.workers, args.seed, args.cache_dir, args.chunksize)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'k':>3} {'silhouette':>10} {'CH':>10} {'inertia':>12} {'min share':>9} {'fit s':>6}")
+    for r in report["results"]:
+        print(f"{r['k']:>3} {r['silhouette']!s:>10} {r['calinski_harabasz']!s:>10} {r['inertia']:>12} "
+              f"{r['smallest_cluster_share']:>9} {r['fit_s']:>6}")
+    print(f"Best k by sampled silhouette: {report['best_k_by_silhouette']} "
+          f"({report['elapsed_s']}s, report: {args.out})")
+
+
+if __name__ == "__main__":
+    main()
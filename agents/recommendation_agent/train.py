@@ -1,95 +1,28 @@
+import argparse
 import json
 from pathlib import Path
 
 import joblib
 import numpy as np
 import pandas as pd
-from sklearn.base import BaseEstimator, TransformerMixin
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
-RAW_NUM = [
-    "no_of_dependents","income_annum","loan_amount","loan_term","cibil_score",
-    "residential_assets_value","commercial_assets_value","luxury_assets_value","bank_asset_value"
-]
-RAW_CAT = ["education","self_employed"]
+from agents.recommendation_agent.compiled import check_csv, compile_pipeline
+from agents.recommendation_agent.features import RAW_CAT, RAW_NUM, RiskFeatureBuilder
+from agents.recommendation_agent.manifest import MANIFEST_FILE, write_manifest
 
-ANNUAL_INTEREST = 0.12
-MONTHLY_RATE = ANNUAL_INTEREST / 12
+# Run from the repo root: python -m agents.recommendation_agent.train
+# (the pipeline then pickles agents.recommendation_agent.features.RiskFeatureBuilder, not a __main__ copy)
+#
+# For a loan book that does not fit in memory:
+#   python -m agents.recommendation_agent.train --stream [--chunksize 100000] [--epochs 3]
 
 MODELS_DIR = Path("models")
-MODELS_DIR.mkdir(exist_ok=True)
-
-# Feature Engineering Transformer
-class RiskFeatureBuilder(BaseEstimator, TransformerMixin):
-    """Takes a DataFrame with the 11 raw columns and returns a DataFrame
-       with engineered risk features appended (loan_to_income, emi, dti, logs),
-       plus cleaned raw columns (clipped, imputed)."""
-
-    def fit(self, X, y=None):
-        return self
-
-    def transform(self, X):
-        df = X.copy()
-        # Normalize column names and keep only required
-        df.columns = df.columns.str.strip()
-        needed = RAW_NUM + RAW_CAT
-        missing = [c for c in needed if c not in df.columns]
-        if missing:
-            raise ValueError(f"Missing required columns: {missing}")
-        df = df[needed].copy()
-
-        # Coerce numerics
-        df[RAW_NUM] = df[RAW_NUM].apply(pd.to_numeric, errors="coerce")
-
-        # Basic impute for raw numerics
-        df[RAW_NUM] = df[RAW_NUM].fillna(df[RAW_NUM].median(numeric_only=True))
-        # Guard/clip
-        df["loan_term"] = df["loan_term"].clip(lower=1)  # in years
-        for col in ["income_annum","loan_amount",
-                    "residential_assets_value","commercial_assets_value",
-                    "luxury_assets_value","bank_asset_value"]:
-            df[col] = df[col].clip(lower=0)
-
-        # Categorical impute
-        for c in RAW_CAT:
-            if df[c].isna().any():
-                df[c] = df[c].fillna("Unknown")
-
-        # Derived features
-        # loan_to_income
-        df["loan_to_income"] = df["loan_amount"] / (df["income_annum"] + 1e-6)
-
-        # EMI
-        def compute_emi(p, r, n):
-            if p <= 0 or n <= 0:
-                return 0.0
-            pow_ = (1 + r) ** n
-            return p * r * pow_ / (pow_ - 1)
-        term_months = (df["loan_term"] * 12).astype(int).clip(lower=1)
-        df["emi"] = [compute_emi(p, MONTHLY_RATE, n) for p, n in zip(df["loan_amount"].values, term_months.values)]
-
-        # DTI
-        df["monthly_income"] = df["income_annum"] / 12.0
-        df["dti"] = df["emi"] / (df["monthly_income"] + 1e-6)
-
-        # log transforms (skew guards)
-        for col in ["income_annum","loan_amount",
-                    "residential_assets_value","commercial_assets_value",
-                    "luxury_assets_value","bank_asset_value"]:
-            df[f"log_{col}"] = np.log1p(df[col].clip(lower=0))
-
-        # Clean engineered NaN/inf
-        eng = ["loan_to_income","dti","emi","monthly_income",
-               "log_income_annum","log_loan_amount",
-               "log_residential_assets_value","log_commercial_assets_value",
-               "log_luxury_assets_value","log_bank_asset_value"]
-        df[eng] = df[eng].replace([np.inf, -np.inf], np.nan)
-        df[eng] = df[eng].fillna(df[eng].median(numeric_only=True))
-
-        return df
+DATA_CSV = "data/raw/loan_approval_dataset.csv"
+N_CLUSTERS = 3
 
 # Features used downstream (post-feature-builder)
 NUM_FEATURES = [
@@ -100,86 +33,239 @@ NUM_FEATURES = [
 ]
 CAT_FEATURES = RAW_CAT
 
-# Load the data
-df_raw = pd.read_csv("data/raw/loan_approval_dataset.csv")
-df_raw.columns = df_raw.columns.str.strip()
-
-# Pipeline components
-# OneHotEncoder API compat
-try:
-    ohe = OneHotEncoder(handle_unknown="ignore", sparse_output=False)  # sklearn >= 1.2
-except TypeError:
-    ohe = OneHotEncoder(handle_unknown="ignore", sparse=False)         # sklearn <= 1.1
-
-preproc = ColumnTransformer(
-    transformers=[
-        ("num", StandardScaler(), NUM_FEATURES),
-        ("cat", ohe, CAT_FEATURES),
-    ],
-    remainder="drop",
-)
-
-pipe = Pipeline(steps=[
-    ("feats", RiskFeatureBuilder()),
-    ("prep", preproc),
-    ("kmeans", KMeans(n_clusters=3, random_state=42, n_init=10)),
-])
-
-# Fit the pipeline
-pipe.fit(df_raw)  # fits feats -> prep -> kmeans
-labels = pipe.named_steps["kmeans"].labels_
-
-print("Cluster counts:", np.bincount(labels))
-
-# Profile & Map Risk Levels
-# Build engineered frame for profiling 
-fe = RiskFeatureBuilder().transform(df_raw)
-profiling = pd.DataFrame({
-    "cluster": labels,
-    "loan_to_income": fe["loan_to_income"].values,
-    "dti": fe["dti"].values,
-    "cibil": fe["cibil_score"].values
-})
-prof = profiling.groupby("cluster").agg(
-    avg_lti=("loan_to_income","mean"),
-    avg_dti=("dti","mean"),
-    avg_cibil=("cibil","mean"),
-)
-print("\n[Cluster Profiles]\n", prof)
-
-# Sort by worse risk first: high LTI & DTI, low CIBIL
-prof_sorted = prof.sort_values(by=["avg_lti","avg_dti","avg_cibil"], ascending=[False, False, True])
-risk_names = ["High Risk","Medium Risk","Low Risk"]
-cluster_to_risk = {int(c): risk_names[i] for i, c in enumerate(prof_sorted.index)}
-print("\n[Cluster → Risk Mapping]\n", cluster_to_risk)
-
-# Save the models and mappings
-joblib.dump(pipe, MODELS_DIR / "risk_cluster_pipeline.joblib")
-with open(MODELS_DIR / "cluster_to_risk.json", "w") as f:
-    json.dump({str(k): v for k, v in cluster_to_risk.items()}, f, indent=2)
-
-# Basic recommendations
-recs = {
-    "Low Risk": [
-        "Maintain timely EMI payments",
-        "Consider part-prepayment to save interest",
-        "Keep credit utilization low (<30%)",
-    ],
-    "Medium Risk": [
-        "Keep DTI below ~40%; consider longer tenure",
-        "Avoid new credit lines until score improves",
-        "Track expenses; build 3–6 month emergency fund",
-    ],
-    "High Risk": [
-        "Reduce loan amount or increase down payment",
-        "Improve CIBIL for 3–6 months before reapplying",
-        "Add co-borrower or show additional income proof",
-    ],
-}
-with open(MODELS_DIR / "recommendations.json", "w") as f:
-    json.dump(recs, f, indent=2)
-
-print("\nTraining complete. Saved:")
-print(f"  - {MODELS_DIR/'risk_cluster_pipeline.joblib'}")
-print(f"  - {MODELS_DIR/'cluster_to_risk.json'}")
-print(f"  - {MODELS_DIR/'recommendations.json'}")
+# Streaming mode: imputation medians come from a uniform sample of this many rows
+RESERVOIR_ROWS = 100_000
+MINIBATCH_ROWS = 1024
+
+
+def _one_hot(categories="auto"):
+    # OneHotEncoder API compat
+    try:
+        return OneHotEncoder(categories=categories, handle_unknown="ignore", sparse_output=False)  # sklearn >= 1.2
+    except TypeError:
+        return OneHotEncoder(categories=categories, handle_unknown="ignore", sparse=False)         # sklearn <= 1.1
+
+
+def build_preprocessor(categories="auto") -> ColumnTransformer:
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), NUM_FEATURES),
+            ("cat", _one_hot(categories), CAT_FEATURES),
+        ],
+        remainder="drop",
+    )
+
+
+def risk_mapping(prof: pd.DataFrame) -> dict:
+    # Sort by worse risk first: high LTI & DTI, low CIBIL
+    prof_sorted = prof.sort_values(by=["avg_lti","avg_dti","avg_cibil"], ascending=[False, False, True])
+    risk_names = ["High Risk","Medium Risk","Low Risk"]
+    return {int(c): risk_names[i] for i, c in enumerate(prof_sorted.index)}
+
+
+def train_in_memory(csv_path: str = DATA_CSV, n_clusters: int = N_CLUSTERS):
+    # Load the data
+    df_raw = pd.read_csv(csv_path)
+    df_raw.columns = df_raw.columns.str.strip()
+
+    pipe = Pipeline(steps=[
+        ("feats", RiskFeatureBuilder()),
+        ("prep", build_preprocessor()),
+        ("kmeans", KMeans(n_clusters=n_clusters, random_state=42, n_init=10)),
+    ])
+
+    # Fit the pipeline
+    pipe.fit(df_raw)  # fits feats (imputation medians) -> prep -> kmeans
+    labels = pipe.named_steps["kmeans"].labels_
+
+    print("Cluster counts:", np.bincount(labels))
+
+    # Profile & Map Risk Levels
+    # Build engineered frame for profiling (with the fitted builder's medians)
+    fe = pipe.named_steps["feats"].transform(df_raw)
+    profiling = pd.DataFrame({
+        "cluster": labels,
+        "loan_to_income": fe["loan_to_income"].values,
+        "dti": fe["dti"].values,
+        "cibil": fe["cibil_score"].values
+    })
+    prof = profiling.groupby("cluster").agg(
+        avg_lti=("loan_to_income","mean"),
+        avg_dti=("dti","mean"),
+        avg_cibil=("cibil","mean"),
+    )
+    return pipe, prof
+
+
+def _chunks(csv_path: str, chunksize: int):
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk
+
+
+def streaming_features(builder, chunk: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(builder.transform_columns(chunk))
+
+
+def fit_streaming_preprocessor(csv_path: str = DATA_CSV, chunksize: int = 100_000, seed: int = 42):
+    """
+    Passes 1 and 2 of train_streaming: the fitted feature builder and ColumnTransformer, plus the
+    raw reservoir sample and the row count of the file. Memory is bounded by the chunk size.
+
+      pass 1       reservoir sample of the raw columns (-> imputation medians) + category sets
+      pass 2       StandardScaler.partial_fit on the engineered features
+    """
+    rng = np.random.default_rng(seed)
+    raw_cols = RAW_NUM + RAW_CAT
+
+    # pass 1: Algorithm R over rows, so the medians come from a uniform sample of the whole file
+    reservoir = np.empty((RESERVOIR_ROWS, len(raw_cols)), dtype=object)
+    categories = {c: set() for c in CAT_FEATURES}
+    seen = 0
+    for chunk in _chunks(csv_path, chunksize):
+        rows = chunk[raw_cols].to_numpy(dtype=object)
+        fill = max(0, min(len(rows), RESERVOIR_ROWS - seen))
+        reservoir[seen:seen + fill] = rows[:fill]
+        if fill < len(rows):
+            slots = rng.integers(0, np.arange(seen + fill, seen + len(rows)) + 1)
+            keep = np.flatnonzero(slots < RESERVOIR_ROWS)
+            reservoir[slots[keep]] = rows[fill + keep]
+        seen += len(rows)
+        for c in CAT_FEATURES:
+            categories[c].update(chunk[c].fillna("Unknown").unique().tolist())
+
+    sample = pd.DataFrame(reservoir[:min(seen, RESERVOIR_ROWS)], columns=raw_cols)
+    builder = RiskFeatureBuilder().fit(sample)
+    cat_lists = [sorted(categories[c]) for c in CAT_FEATURES]
+    print(f"Pass 1: {seen} rows, medians from {min(seen, RESERVOIR_ROWS)} sampled rows")
+
+    # pass 2: scaler statistics (exact, accumulated chunk by chunk)
+    scaler = StandardScaler()
+    for chunk in _chunks(csv_path, chunksize):
+        scaler.partial_fit(streaming_features(builder, chunk)[NUM_FEATURES])
+
+    # ColumnTransformer with the streamed scaler (fitted on the sample for its structure, then swapped in)
+    prep = build_preprocessor(cat_lists)
+    prep.fit(streaming_features(builder, sample))
+    prep.transformers_ = [(name, scaler if name == "num" else trans, cols) for name, trans, cols in prep.transformers_]
+    print("Pass 2: scaler fitted")
+    return builder, prep, sample, seen
+
+
+def train_streaming(csv_path: str = DATA_CSV, n_clusters: int = N_CLUSTERS, chunksize: int = 100_000,
+                    epochs: int = 3, seed: int = 42):
+    """
+    Same pipeline as train_in_memory, fitted from CSV chunks so memory is bounded by the chunk size:
+
+      passes 1-2   fit_streaming_preprocessor (imputation medians and initial centroids from a
+                   reservoir sample, streamed scaler statistics)
+      passes 3..   MiniBatchKMeans.partial_fit, `epochs` times over the data; the last epoch also
+                   accumulates the per-cluster LTI / DTI / CIBIL sums for the risk mapping
+    """
+    builder, prep, sample, _ = fit_streaming_preprocessor(csv_path, chunksize, seed)
+
+    def features(chunk):
+        return streaming_features(builder, chunk)
+
+    # passes 3..: mini-batch k-means seeded with a full KMeans on the sample (a random mini-batch
+    # init lands in much worse optima); profiles are summed during the last epoch with the labels
+    # each row gets right after its batch update
+    seed_centers = KMeans(n_clusters=n_clusters, random_state=seed, n_init=10).fit(prep.transform(features(sample))).cluster_centers_
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=seed, batch_size=MINIBATCH_ROWS,
+                             init=seed_centers, n_init=1)
+    counts = np.zeros(n_clusters)
+    sums = np.zeros((n_clusters, 3))   # loan_to_income, dti, cibil_score
+    for epoch in range(epochs):
+        last = epoch == epochs - 1
+        for chunk in _chunks(csv_path, chunksize):
+            fe = features(chunk)
+            Z = prep.transform(fe)
+            prof_cols = fe[["loan_to_income", "dti", "cibil_score"]].to_numpy(dtype=float)
+            for start in range(0, len(Z), MINIBATCH_ROWS):
+                batch = Z[start:start + MINIBATCH_ROWS]
+                if len(batch) < n_clusters and not hasattr(kmeans, "cluster_centers_"):
+                    continue  # the first update needs at least one row per cluster
+                kmeans.partial_fit(batch)
+                if last:
+                    labels = kmeans.predict(batch)
+                    counts += np.bincount(labels, minlength=n_clusters)
+                    np.add.at(sums, labels, prof_cols[start:start + MINIBATCH_ROWS])
+        print(f"Epoch {epoch + 1}/{epochs} done")
+
+    pipe = Pipeline(steps=[("feats", builder), ("prep", prep), ("kmeans", kmeans)])
+    print("Cluster counts:", counts.astype(int))
+    means = sums / np.maximum(counts, 1)[:, None]
+    prof = pd.DataFrame({"avg_lti": means[:, 0], "avg_dti": means[:, 1], "avg_cibil": means[:, 2]},
+                        index=pd.Index(range(n_clusters), name="cluster"))
+    return pipe, prof
+
+
+def save(pipe, cluster_to_risk: dict, models_dir: Path = MODELS_DIR, csv_path: str | None = DATA_CSV):
+    models_dir.mkdir(exist_ok=True)
+    # Save the models and mappings
+    joblib.dump(pipe, models_dir / "risk_cluster_pipeline.joblib")
+    with open(models_dir / "cluster_to_risk.json", "w") as f:
+        json.dump({str(k): v for k, v in cluster_to_risk.items()}, f, indent=2)
+
+    # Basic recommendations
+    recs = {
+        "Low Risk": [
+            "Maintain timely EMI payments",
+            "Consider part-prepayment to save interest",
+            "Keep credit utilization low (<30%)",
+        ],
+        "Medium Risk": [
+            "Keep DTI below ~40%; consider longer tenure",
+            "Avoid new credit lines until score improves",
+            "Track expenses; build 3–6 month emergency fund",
+        ],
+        "High Risk": [
+            "Reduce loan amount or increase down payment",
+            "Improve CIBIL for 3–6 months before reapplying",
+            "Add co-borrower or show additional income proof",
+        ],
+    }
+    with open(models_dir / "recommendations.json", "w") as f:
+        json.dump(recs, f, indent=2)
+
+    # The compiled clusterer is checked against the pipeline on the whole training CSV once, here,
+    # so serving workers only need a small probe at startup
+    compiled_check = None
+    if csv_path is not None:
+        compiled_check = check_csv(compile_pipeline(pipe), pipe, csv_path)
+        print(f"Compiled clusterer check: {compiled_check['mismatches']} mismatches "
+              f"on {compiled_check['rows']} rows")
+
+    # Index of the saved artifacts (paths + hashes), read by predict.py instead of searching for them
+    write_manifest(models_dir, compiled_check)
+
+    print("\nTraining complete. Saved:")
+    print(f"  - {models_dir/'risk_cluster_pipeline.joblib'}")
+    print(f"  - {models_dir/'cluster_to_risk.json'}")
+    print(f"  - {models_dir/'recommendations.json'}")
+    print(f"  - {models_dir/MANIFEST_FILE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the risk clustering pipeline")
+    parser.add_argument("--csv", default=DATA_CSV)
+    parser.add_argument("--clusters", type=int, default=N_CLUSTERS)
+    parser.add_argument("--stream", action="store_true", help="fit from CSV chunks (bounded memory)")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--out", default=str(MODELS_DIR))
+    args = parser.parse_args()
+
+    if args.stream:
+        pipe, prof = train_streaming(args.csv, args.clusters, args.chunksize, args.epochs)
+    else:
+        pipe, prof = train_in_memory(args.csv, args.clusters)
+    print("\n[Cluster Profiles]\n", prof)
+
+    cluster_to_risk = risk_mapping(prof)
+    print("\n[Cluster → Risk Mapping]\n", cluster_to_risk)
+    save(pipe, cluster_to_risk, Path(args.out), args.csv)
+
+
+if __name__ == "__main__":
+    main()
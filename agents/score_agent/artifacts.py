@@ -0,0 +1,154 @@
+"""
+Array artifacts for the score agent.
+
+The compiled kernel (scaler statistics, one-hot layout, weight matrices) plus the SHAP
+background / feature means are written as plain .npy files next to a small layout.json.
+load_arrays() memory-maps them read-only, so every uvicorn worker on a box maps the same
+page-cache pages instead of unpickling a private copy of the weights.
+
+Convert the existing pickles (run from the repo root):
+    python -m agents.score_agent.artifacts                  # every model_info/*_info folder
+    python -m agents.score_agent.artifacts mlpClassifier_info
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from agents.score_agent.compiled import CompiledModel, CompiledPreprocessor, CompiledScorer
+
+MODEL_INFO_DIR = "agents/score_agent/model/model_info"
+ARRAYS_DIRNAME = "arrays"
+LAYOUT_FILE = "layout.json"
+FORMAT_VERSION = 1
+
+
+def _save(out_dir: str, name: str, array) -> str:
+    filename = f"{name}.npy"
+    # C-contiguous float64 so np.load(mmap_mode="r") can map the file as-is
+    np.save(os.path.join(out_dir, filename), np.ascontiguousarray(array, dtype=float))
+    return filename
+
+
+def save_arrays(scorer: CompiledScorer, out_dir: str, extras: dict | None = None, source_version: str | None = None) -> str:
+    """Writes the kernel and extra arrays (e.g. background, feature_means) to out_dir; returns the layout path."""
+    os.makedirs(out_dir, exist_ok=True)
+    pre, model = scorer.preprocessor, scorer.model
+
+    numeric = []
+    for i, (in_idx, out_idx, mean, scale) in enumerate(pre.numeric_blocks):
+        numeric.append({
+            "input_idx": [int(v) for v in in_idx],
+            "output_idx": [int(v) for v in out_idx],
+            "mean": _save(out_dir, f"numeric_{i}_mean", mean),
+            "scale": _save(out_dir, f"numeric_{i}_scale", scale),
+        })
+    onehot = []
+    for idx, offset, lookup in pre.onehot_blocks:
+        categories = [cat for cat, _ in sorted(lookup.items(), key=lambda item: item[1])]
+        onehot.append({"input_idx": int(idx), "offset": int(offset), "categories": categories})
+
+    layers = [[_save(out_dir, f"layer_{i}_weights", W), _save(out_dir, f"layer_{i}_bias", b)]
+              for i, (W, b) in enumerate(model.layers)]
+
+    layout = {
+        "format": FORMAT_VERSION,
+        "source_version": source_version,
+        "preprocessor": {
+            "input_columns": pre.input_columns,
+            "feature_names_out": [str(n) for n in pre.feature_names_out],
+            "n_features_out": int(pre.n_features_out),
+            "numeric": numeric,
+            "onehot": onehot,
+        },
+        "model": {
+            "activation": model.activation,
+            "classes": model.classes_.tolist(),
+            "layers": layers,
+        },
+        "extras": {name: _save(out_dir, name, value) for name, value in (extras or {}).items() if value is not None},
+    }
+    path = os.path.join(out_dir, LAYOUT_FILE)
+    with open(path, "w") as f:
+        json.dump(layout, f, indent=2)
+    return path
+
+
+def read_layout(arrays_dir: str) -> dict:
+    with open(os.path.join(arrays_dir, LAYOUT_FILE)) as f:
+        return json.load(f)
+
+
+def load_arrays(arrays_dir: str, mmap: bool = True):
+    """-> (CompiledScorer, {extra name: array}); arrays are read-only memory maps unless mmap=False."""
+    layout = read_layout(arrays_dir)
+    if layout.get("format") != FORMAT_VERSION:
+        raise ValueError(f"unsupported array artifact format {layout.get('format')} in {arrays_dir}")
+    mode = "r" if mmap else None
+
+    def load(filename):
+        return np.load(os.path.join(arrays_dir, filename), mmap_mode=mode)
+
+    p = layout["preprocessor"]
+    numeric_blocks = [(np.array(b["input_idx"]), np.array(b["output_idx"]), load(b["mean"]), load(b["scale"]))
+                      for b in p["numeric"]]
+    onehot_blocks = [(b["input_idx"], b["offset"], {cat: code for code, cat in enumerate(b["categories"])})
+                     for b in p["onehot"]]
+    pre = CompiledPreprocessor(p["input_columns"], numeric_blocks, onehot_blocks, p["n_features_out"], p["feature_names_out"])
+
+    m = layout["model"]
+    model = CompiledModel([(load(W), load(b)) for W, b in m["layers"]], m["activation"], m["classes"])
+    extras = {name: load(filename) for name, filename in layout["extras"].items()}
+    return CompiledScorer(pre, model), extras
+
+
+def array_files(arrays_dir: str) -> list:
+    """Every file of an array artifact (layout first), e.g. for artifact_version()."""
+    layout = read_layout(arrays_dir)
+    names = [f for b in layout["preprocessor"]["numeric"] for f in (b["mean"], b["scale"])]
+    names += [f for pair in layout["model"]["layers"] for f in pair]
+    names += list(layout["extras"].values())
+    return [os.path.join(arrays_dir, n) for n in [LAYOUT_FILE] + names]
+
+
+def convert_model_info(info_dir: str) -> str:
+    """Converts one model_info/<name>_info folder of pickles into <info_dir>/arrays."""
+    import joblib
+
+    from agents.score_agent.cache import artifact_version
+    from agents.score_agent.compiled import compile_scorer, sample_records, verify
+
+    name = os.path.basename(os.path.normpath(info_dir)).removesuffix("_info")
+    model_path = os.path.join(info_dir, f"{name}.pkl")
+    preprocessor_path = os.path.join(info_dir, f"{name}_preprocessor.pkl")
+    model = joblib.load(model_path)
+    preprocessor = joblib.load(preprocessor_path)
+
+    scorer = compile_scorer(preprocessor, model)
+    max_err = verify(scorer, preprocessor, model, sample_records(preprocessor))
+
+    extras = {}
+    for extra in ("background", "feature_means"):
+        path = os.path.join(info_dir, f"{name}_{extra}.pkl")
+        if os.path.exists(path):
+            extras[extra] = np.asarray(joblib.load(path), dtype=float)
+
+    out_dir = os.path.join(info_dir, ARRAYS_DIRNAME)
+    save_arrays(scorer, out_dir, extras, source_version=artifact_version([model_path, preprocessor_path]))
+
+    # the written files must round-trip to the same probabilities as the pickles
+    loaded, _ = load_arrays(out_dir)
+    verify(loaded, preprocessor, model, sample_records(preprocessor))
+    print(f"{name}: wrote {out_dir} (max abs error vs sklearn: {max_err:.2e}, extras: {sorted(extras)})")
+    return out_dir
+
+
+def main(argv: list) -> None:
+    names = argv or sorted(d for d in os.listdir(MODEL_INFO_DIR) if d.endswith("_info"))
+    for d in names:
+        convert_model_info(d if os.path.isdir(d) else os.path.join(MODEL_INFO_DIR, d))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,122 @@
+"""Dynamic micro-batching: concurrent single-row calls are coalesced into one matrix call."""
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds values <= bounds[i], the last bucket is overflow."""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        labels = [f"<={b}" for b in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.total,
+            "mean": round(self.sum / self.total, 4) if self.total else 0.0,
+        }
+
+
+class MicroBatcher:
+    """
+    submit(record) blocks until the record has been processed as part of a batch.
+    A batch closes when max_rows records are waiting or max_wait_ms has passed since
+    its first record arrived. batch_fn takes a list of records and returns one result per record.
+    A caller waits at most timeout_s for its result (TimeoutError), and anything that goes wrong
+    while a batch is processed is raised in every caller of that batch instead of leaving them waiting.
+    """
+
+    def __init__(self, batch_fn, max_rows: int = 64, max_wait_ms: float = 2.0, timeout_s: float = 30.0):
+        self.batch_fn = batch_fn
+        self.max_rows = max_rows
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.timeout_s = timeout_s
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        self.wait_ms = Histogram([0.25, 0.5, 1, 2, 5, 10, 20, 50, 100])
+        self._worker = threading.Thread(target=self._run, name="score-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, record):
+        if not self._worker.is_alive():
+            raise RuntimeError("micro-batcher worker is not running")
+        future = Future()
+        self._queue.put((record, future, time.perf_counter()))
+        try:
+            return future.result(timeout=self.timeout_s)
+        except TimeoutError:
+            future.cancel()  # the worker skips it if the batch has not started yet
+            raise
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait_s
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch: list):
+        started = time.perf_counter()
+        with self._lock:
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.wait_ms.observe((started - enqueued) * 1000.0)
+
+        # callers that timed out cancelled their futures; their records are not scored
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        records = [record for record, _, _ in batch]
+        try:
+            results = self.batch_fn(records)
+        except Exception:
+            # one bad record must not fail its neighbours: retry row by row
+            for record, future, _ in batch:
+                try:
+                    future.set_result(self.batch_fn([record])[0])
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        if len(results) != len(batch):
+            raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} records")
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_rows": self.max_rows,
+                "max_wait_ms": self.max_wait_s * 1000.0,
+                "queued": self._queue.qsize(),
+                "batch_size": self.batch_sizes.to_dict(),
+                "wait_ms": self.wait_ms.to_dict(),
+            }
@@ -0,0 +1,204 @@
+"""
+One servable model version: its artifacts, the compiled kernel and the SHAP explainers.
+
+The score agent serves every request from a single ModelBundle reference. A hot reload builds
+and warms a new bundle off the request path and then swaps the reference, so in-flight requests
+finish on the bundle they started with.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from agents.score_agent.artifacts import LAYOUT_FILE, array_files, load_arrays, read_layout
+from agents.score_agent.cache import artifact_version
+from agents.score_agent.compiled import can_compile, compile_scorer, sample_records, verify
+from agents.score_agent.explain import LinearShap, TieredKernelExplainer, TreeShap
+
+
+def use_arrays(paths: dict, artifacts_mode: str = "auto", inference: str = "compiled") -> bool:
+    """
+    artifacts_mode: "arrays" serves from memory-mapped .npy files (shared page cache between workers),
+    "pickle" from the joblib pickles, "auto" uses arrays when they exist and match the pickles.
+    """
+    if artifacts_mode == "pickle" or (artifacts_mode == "auto" and inference == "sklearn"):
+        return False
+    arrays_dir = paths.get("arrays")
+    if not arrays_dir or not os.path.exists(os.path.join(arrays_dir, LAYOUT_FILE)):
+        if artifacts_mode == "arrays":
+            raise FileNotFoundError(f"{arrays_dir} is missing, run: python -m agents.score_agent.artifacts")
+        return False
+    if artifacts_mode == "auto":
+        # arrays converted from an older pickle are ignored rather than served
+        pickles = [paths["model"], paths["preprocessor"]]
+        if all(os.path.exists(p) for p in pickles) and read_layout(arrays_dir).get("source_version") != artifact_version(pickles):
+            print(f"{arrays_dir} is stale (pickles changed), loading the pickles")
+            return False
+    return True
+
+
+def load_artifacts(paths: dict, artifacts_mode: str = "auto", inference: str = "compiled") -> dict:
+    """Loads one model's artifacts (model, preprocessor, metrics and optional extras) from {kind: path}."""
+    if use_arrays(paths, artifacts_mode, inference):
+        # the CompiledScorer stands in for the sklearn model; there is no preprocessor object
+        scorer, extras = load_arrays(paths["arrays"], mmap=True)
+        with open(paths["metrics"]) as f:
+            return {"model": scorer, "compiled": scorer, "metrics": json.load(f),
+                    "arrays_dir": paths["arrays"], **extras}
+
+    import joblib
+
+    artifacts = {}
+    for key, path in paths.items():
+        if key == "arrays" or not os.path.exists(path):
+            continue
+        if path.endswith(".json"):
+            with open(path) as f:
+                artifacts[key] = json.load(f)
+        else:
+            artifacts[key] = joblib.load(path)
+    return artifacts
+
+
+def artifacts_version(paths: dict, artifacts: dict) -> str:
+    if "arrays_dir" in artifacts:
+        # same version as the pickles the arrays were converted from, so cached results stay valid
+        return (read_layout(artifacts["arrays_dir"]).get("source_version")
+                or artifact_version(array_files(artifacts["arrays_dir"])))
+    return artifact_version([paths["model"], paths["preprocessor"]])
+
+
+def _to_frame(records: list):
+    # only the sklearn path needs pandas, so it is not imported at startup
+    import pandas as pd
+
+    # Convert applicant dictionaries to a DataFrame (one row per applicant)
+    applicant_df = pd.DataFrame(records)
+
+    # Clean columns
+    applicant_df.columns = applicant_df.columns.str.strip()
+    for col in applicant_df.select_dtypes(include='object').columns:
+        applicant_df[col] = applicant_df[col].str.strip()
+    return applicant_df
+
+
+class ModelBundle:
+    def __init__(self, name: str, artifacts: dict, version: str, source: str, inference: str = "compiled"):
+        self.name = name
+        self.version = version
+        self.source = source
+        self.model = artifacts["model"]
+        self.preprocessor = artifacts.get("preprocessor", None)
+        self.metrics = artifacts["metrics"]
+        self.background = artifacts.get("background", None)
+        self.arrays_dir = artifacts.get("arrays_dir")
+        self.artifact_format = "arrays" if self.arrays_dir else "pickle"
+        self.loaded_at = time.time()
+        self.load_ms = 0.0
+        self.warm_ms = None
+        self.explainer_pool = None  # attached by the agent when SHAP runs in worker processes
+        self.paths = {}
+
+        # The compiled kernel is checked against sklearn on probe rows before it is allowed to serve
+        # traffic (array artifacts were checked by the converter and have no sklearn objects to compare with).
+        # Model types the kernel does not cover (tree ensembles) go straight to the sklearn path.
+        self.compiled_scorer = artifacts.get("compiled")
+        self.compile_ms = 0.0
+        if self.compiled_scorer is None and inference == "compiled" and can_compile(self.model):
+            start = time.perf_counter()
+            try:
+                self.compiled_scorer = compile_scorer(self.preprocessor, self.model)
+                max_err = verify(self.compiled_scorer, self.preprocessor, self.model, sample_records(self.preprocessor))
+                print(f"Compiled inference enabled for {name} (max abs error vs sklearn: {max_err:.2e})")
+            except Exception as e:
+                print(f"Compiled inference disabled for {name}, using sklearn path: {e}")
+                self.compiled_scorer = None
+            self.compile_ms = round((time.perf_counter() - start) * 1000.0, 2)
+
+        # SHAP explainer for MLP (shap itself is imported the first time an explainer is built)
+        self.mlp_explainer = None
+        if name == "mlpClassifier" and self.background is not None:
+            self.mlp_explainer = TieredKernelExplainer(self.model.predict_proba, self.background)
+
+        # Logistic regression SHAP is closed form: coef * (x - training mean), built once here
+        self.linear_explainer = None
+        if name == "logisticRegression":
+            feature_means = artifacts.get("feature_means")
+            if feature_means is None and self.background is not None:
+                feature_means = np.asarray(self.background).mean(axis=0)
+            if feature_means is not None and "compiled" in artifacts:
+                weights, bias = self.model.model.layers[0]
+                self.linear_explainer = LinearShap(weights[:, 0], bias, feature_means)
+            elif feature_means is not None:
+                self.linear_explainer = LinearShap.from_model(self.model, feature_means)
+
+        # Tree ensembles get exact TreeSHAP from the trees (probability space, against the background)
+        self.tree_explainer = None
+        if TreeShap.supports(self.model) and self.background is not None:
+            self.tree_explainer = TreeShap(self.model, self.background)
+
+    @classmethod
+    def load(cls, name: str, paths: dict, source: str, artifacts_mode: str = "auto", inference: str = "compiled",
+             version: str | None = None):
+        start = time.perf_counter()
+        artifacts = load_artifacts(paths, artifacts_mode, inference)
+        bundle = cls(name, artifacts, version or artifacts_version(paths, artifacts), source, inference)
+        bundle.paths = paths
+        bundle.load_ms = round((time.perf_counter() - start) * 1000.0, 2)
+        return bundle
+
+    def transform(self, records: list):
+        """Applicant dicts -> model input matrix (compiled kernel when enabled)."""
+        if self.compiled_scorer is not None:
+            return self.compiled_scorer.transform_records(records)
+        # Transform using preprocessor (handles encoding + scaling)
+        return self.preprocessor.transform(_to_frame(records))
+
+    def predict(self, applicant_transformed):
+        """Single vectorized pass: probability of approval and predicted class per row."""
+        model = self.compiled_scorer if self.compiled_scorer is not None else self.model
+        proba = model.predict_proba(applicant_transformed)
+        # predict() is argmax over predict_proba, so reuse it instead of a second forward pass
+        preds = model.classes_[np.argmax(proba, axis=1)]
+        return proba[:, 1], preds
+
+    def feature_names(self, records: list):
+        try:
+            if self.compiled_scorer is not None:
+                return self.compiled_scorer.preprocessor.feature_names_out
+            return self.preprocessor.get_feature_names_out()
+        except:
+            return [str(k).strip() for k in records[0]]
+
+    def model_metrics(self) -> dict:
+        return {
+            "accuracy": self.metrics.get("accuracy"),
+            "precision": self.metrics.get("precision"),
+            "recall": self.metrics.get("recall"),
+            "f1_score": self.metrics.get("f1_score"),
+            "roc_auc": self.metrics.get("roc_auc")
+        }
+
+    def warm(self, explain: bool = True, n_rows: int = 16):
+        """Runs probe rows through transform + predict (and builds every tier's explainer) before taking traffic."""
+        start = time.perf_counter()
+        pre = self.compiled_scorer.preprocessor if self.compiled_scorer is not None else self.preprocessor
+        self.predict(self.transform(sample_records(pre, n_rows)))
+        if explain and self.mlp_explainer is not None and self.explainer_pool is None:
+            self.mlp_explainer.warm()
+        if explain and self.tree_explainer is not None:
+            self.tree_explainer.warm()
+        self.warm_ms = round((time.perf_counter() - start) * 1000.0, 2)
+
+    def describe(self) -> dict:
+        return {
+            "model_used": self.name,
+            "model_version": self.version,
+            "source": self.source,
+            "artifacts": self.artifact_format,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+            "load_ms": self.load_ms,
+            "compile_ms": self.compile_ms,
+            "warm_ms": self.warm_ms,
+        }
@@ -0,0 +1,161 @@
+"""
+Score result cache keyed on a canonical hash of the normalized applicant features plus the
+model name and artifact version, so a retrained/reloaded model never serves stale entries.
+InMemoryCache is a bounded LRU with TTL; RedisCache shares results between workers.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)  # 2 and 2.0 hash the same
+    return str(value)
+
+
+def canonical_key(features: dict, model_name: str, model_version: str, variant: str = "") -> str:
+    canonical = {str(k).strip(): _normalize(v) for k, v in features.items()}
+    blob = json.dumps([model_name, model_version, variant, canonical], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def artifact_version(paths) -> str:
+    """Content hash of the artifact files; changes whenever a model is retrained."""
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+class InMemoryCache:
+    def __init__(self, max_items: int = 10000, ttl_s: float = 600.0):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: str):
+        _, blob = self._items.pop(key)
+        self._bytes -= len(blob)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._items.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[1])
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: dict):
+        # stored as JSON so callers can never mutate a cached response
+        blob = json.dumps(value)
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (time.monotonic() + self.ttl_s, blob)
+            self._bytes += len(blob)
+            while len(self._items) > self.max_items:
+                self._drop(next(iter(self._items)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "items": len(self._items),
+            "max_items": self.max_items,
+            "ttl_s": self.ttl_s,
+            "memory_bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class RedisCache:
+    """Shared cache for all workers; eviction is left to Redis (TTL + maxmemory policy)."""
+
+    def __init__(self, url: str, ttl_s: float = 600.0, prefix: str = "score:"):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.ttl_s = ttl_s
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        try:
+            blob = self._redis.get(self.prefix + key)
+        except Exception as e:
+            print("score cache (redis) read error:", e)
+            blob = None
+        if blob is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(blob)
+
+    def set(self, key: str, value: dict):
+        try:
+            self._redis.set(self.prefix + key, json.dumps(value), ex=max(int(self.ttl_s), 1))
+        except Exception as e:
+            print("score cache (redis) write error:", e)
+
+    def clear(self):
+        for key in self._redis.scan_iter(match=self.prefix + "*"):
+            self._redis.delete(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": "redis",
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        try:
+            stats["memory_bytes"] = self._redis.info("memory").get("used_memory")
+        except Exception:
+            stats["memory_bytes"] = None
+        return stats
+
+
+def build_cache():
+    """From env: SCORE_CACHE_SIZE (0 = off), SCORE_CACHE_TTL_S, SCORE_CACHE_REDIS_URL (optional)."""
+    size = int(os.getenv("SCORE_CACHE_SIZE", "10000"))
+    ttl_s = float(os.getenv("SCORE_CACHE_TTL_S", "600"))
+    redis_url = os.getenv("SCORE_CACHE_REDIS_URL")
+    if size <= 0:
+        return None
+    if redis_url:
+        try:
+            return RedisCache(redis_url, ttl_s)
+        except Exception as e:
+            print(f"Redis score cache unavailable ({e}), using in-memory cache")
+    return InMemoryCache(size, ttl_s)
@@ -0,0 +1,210 @@
+"""
+"Compiled" inference for the score agent.
+
+The fitted ColumnTransformer (StandardScaler + OneHotEncoder) and the LogisticRegression /
+MLPClassifier weights are flattened into plain NumPy arrays, so scoring a row is a few
+array operations on a fixed-order float vector instead of DataFrame + sklearn overhead.
+Categorical columns are carried in that vector as their category index (-1 = unknown).
+"""
+import numpy as np
+
+
+def _expit(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+_ACTIVATIONS = {
+    "identity": lambda z: z,
+    "relu": lambda z: np.maximum(z, 0),
+    "tanh": np.tanh,
+    "logistic": _expit,
+}
+
+
+class CompiledPreprocessor:
+    def __init__(self, input_columns, numeric_blocks, onehot_blocks, n_features_out, feature_names_out):
+        self.input_columns = list(input_columns)
+        self.numeric_blocks = numeric_blocks    # [(input_idx, output_idx, mean, scale)]
+        self.onehot_blocks = onehot_blocks      # [(input_idx, output_offset, {category: code})]
+        self.n_features_out = n_features_out
+        self.feature_names_out = list(feature_names_out)
+        self._categorical = {idx: lookup for idx, _, lookup in onehot_blocks}
+
+    @classmethod
+    def from_sklearn(cls, preprocessor):
+        """Builds the kernel from a fitted ColumnTransformer; raises NotImplementedError when unsupported."""
+        input_columns = list(preprocessor.feature_names_in_)
+        col_index = {c: i for i, c in enumerate(input_columns)}
+        numeric_blocks, onehot_blocks = [], []
+        offset = 0
+
+        for name, trans, cols in preprocessor.transformers_:
+            if isinstance(trans, str):
+                if trans == "drop":
+                    continue
+                raise NotImplementedError(f"cannot compile '{trans}' columns")
+            cols = [input_columns[c] if isinstance(c, (int, np.integer)) else c for c in cols]
+            if not cols:
+                continue
+            kind = type(trans).__name__
+            in_idx = np.array([col_index[c] for c in cols])
+
+            if kind == "StandardScaler":
+                n = len(cols)
+                mean = trans.mean_ if trans.with_mean else np.zeros(n)
+                scale = trans.scale_ if trans.with_std else np.ones(n)
+                numeric_blocks.append((in_idx, np.arange(offset, offset + n), np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)))
+                offset += n
+            elif kind == "OneHotEncoder":
+                if trans.drop is not None or trans.handle_unknown != "ignore":
+                    raise NotImplementedError("OneHotEncoder with drop/handle_unknown!='ignore' is not compiled")
+                for idx, cats in zip(in_idx, trans.categories_):
+                    lookup = {cat: code for code, cat in enumerate(cats.tolist())}
+                    onehot_blocks.append((int(idx), offset, lookup))
+                    offset += len(cats)
+            else:
+                raise NotImplementedError(f"cannot compile transformer {kind}")
+
+        return cls(input_columns, numeric_blocks, onehot_blocks, offset, preprocessor.get_feature_names_out())
+
+    def encode(self, records: list) -> np.ndarray:
+        """Applicant dicts -> fixed-order float array (category codes for categorical columns)."""
+        X = np.empty((len(records), len(self.input_columns)), dtype=float)
+        for r, record in enumerate(records):
+            clean = {str(k).strip(): v for k, v in record.items()}
+            missing = [c for c in self.input_columns if c not in clean]
+            if missing:
+                raise ValueError(f"columns are missing: {set(missing)}")
+            for i, col in enumerate(self.input_columns):
+                v = clean[col]
+                lookup = self._categorical.get(i)
+                if lookup is not None:
+                    X[r, i] = lookup.get(v.strip() if isinstance(v, str) else v, -1)
+                else:
+                    X[r, i] = np.nan if v is None else float(v)
+        return X
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        out = np.zeros((X.shape[0], self.n_features_out))
+        for in_idx, out_idx, mean, scale in self.numeric_blocks:
+            out[:, out_idx] = (X[:, in_idx] - mean) / scale
+        rows = np.arange(X.shape[0])
+        for idx, offset, _ in self.onehot_blocks:
+            codes = X[:, idx].astype(int)
+            known = codes >= 0
+            out[rows[known], offset + codes[known]] = 1.0
+        return out
+
+
+# the model types CompiledModel.from_sklearn can turn into a layer stack
+COMPILABLE_MODELS = ("LogisticRegression", "MLPClassifier")
+
+
+def can_compile(model) -> bool:
+    return type(model).__name__ in COMPILABLE_MODELS
+
+
+class CompiledModel:
+    def __init__(self, layers, hidden_activation, classes):
+        self.layers = layers                    # [(weights, bias)], last layer -> logit
+        self.activation = hidden_activation
+        self.hidden_activation = _ACTIVATIONS[hidden_activation]
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        kind = type(model).__name__
+        if len(model.classes_) != 2:
+            raise NotImplementedError("only binary classifiers are compiled")
+        if kind == "LogisticRegression":
+            layers = [(np.asarray(model.coef_, dtype=float).T, np.asarray(model.intercept_, dtype=float))]
+            return cls(layers, "identity", model.classes_)
+        if kind == "MLPClassifier":
+            if model.out_activation_ != "logistic":
+                raise NotImplementedError(f"MLP output activation {model.out_activation_}")
+            layers = [(np.asarray(W, dtype=float), np.asarray(b, dtype=float))
+                      for W, b in zip(model.coefs_, model.intercepts_)]
+            return cls(layers, model.activation, model.classes_)
+        raise NotImplementedError(f"cannot compile model {kind}")
+
+    def predict_proba(self, X) -> np.ndarray:
+        a = np.asarray(X, dtype=float)
+        for W, b in self.layers[:-1]:
+            a = self.hidden_activation(a @ W + b)
+        W, b = self.layers[-1]
+        p = _expit(a @ W + b).ravel()
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class CompiledScorer:
+    def __init__(self, preprocessor: CompiledPreprocessor, model: CompiledModel):
+        self.preprocessor = preprocessor
+        self.model = model
+        self.classes_ = model.classes_
+
+    def transform_records(self, records: list) -> np.ndarray:
+        return self.preprocessor.transform(self.preprocessor.encode(records))
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.model.predict_proba(X)
+
+
+def compile_scorer(preprocessor, model) -> CompiledScorer:
+    return CompiledScorer(CompiledPreprocessor.from_sklearn(preprocessor), CompiledModel.from_sklearn(model))
+
+
+def sample_records(preprocessor, n_rows: int = 64, seed: int = 0) -> list:
+    """
+    Deterministic probe rows covering every category (plus an unknown one) with numerics
+    spread around the fitted scaler statistics; used to check the kernel against sklearn.
+    """
+    rng = np.random.default_rng(seed)
+    stats, categories = {}, {}
+    if isinstance(preprocessor, CompiledPreprocessor):
+        # same probes from the compiled layout (array artifacts carry no sklearn objects)
+        cols = preprocessor.input_columns
+        for in_idx, _, mean, scale in preprocessor.numeric_blocks:
+            for i, m, s in zip(in_idx, mean, scale):
+                stats[cols[i]] = (float(m), float(s))
+        for idx, _, lookup in preprocessor.onehot_blocks:
+            categories[cols[idx]] = list(lookup) + ["__unknown__"]
+        input_columns = cols
+    else:
+        input_columns = preprocessor.feature_names_in_
+    for _, trans, cols in getattr(preprocessor, "transformers_", []):
+        kind = type(trans).__name__
+        if kind == "StandardScaler":
+            for c, m, s in zip(cols, trans.mean_, trans.scale_):
+                stats[c] = (float(m), float(s))
+        elif kind == "OneHotEncoder":
+            for c, cats in zip(cols, trans.categories_):
+                categories[c] = cats.tolist() + ["__unknown__"]
+
+    rows = []
+    for i in range(n_rows):
+        row = {}
+        for c in input_columns:
+            if c in categories:
+                row[c] = categories[c][i % len(categories[c])]
+            else:
+                m, s = stats.get(c, (0.0, 1.0))
+                row[c] = m + s * float(rng.normal())
+        rows.append(row)
+    return rows
+
+
+def verify(scorer: CompiledScorer, preprocessor, model, records: list, atol: float = 1e-9) -> float:
+    """Max |p_compiled - p_sklearn| over records; raises AssertionError if out of tolerance."""
+    import pandas as pd
+
+    expected = model.predict_proba(preprocessor.transform(pd.DataFrame(records)))
+    got = scorer.predict_proba(scorer.transform_records(records))
+    max_err = float(np.max(np.abs(expected - got)))
+    if not np.isfinite(max_err) or max_err > atol:
+        raise AssertionError(f"compiled kernel differs from sklearn (max abs error {max_err:.3g})")
+    if not np.array_equal(model.classes_[np.argmax(expected, axis=1)], scorer.classes_[np.argmax(got, axis=1)]):
+        raise AssertionError("compiled kernel predicts different classes than sklearn")
+    return max_err
@@ -0,0 +1,269 @@
+"""SHAP helpers for the score agent."""
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class LinearShap:
+    """
+    Exact SHAP values for a linear (logit) model with independent features:
+        phi_ij = coef_j * (x_ij - E[x_j])
+    which is what shap.LinearExplainer computes, without rebuilding an explainer per request.
+    """
+
+    def __init__(self, coef, intercept, feature_means):
+        self.coef = np.asarray(coef, dtype=float).ravel()
+        self.feature_means = np.asarray(feature_means, dtype=float).ravel()
+        if self.coef.shape != self.feature_means.shape:
+            raise ValueError(f"coef has {self.coef.size} features, means have {self.feature_means.size}")
+        self.expected_value = float(np.ravel(intercept)[0] + self.coef @ self.feature_means)
+
+    @classmethod
+    def from_model(cls, model, feature_means):
+        return cls(model.coef_[0], model.intercept_, feature_means)
+
+    def shap_values(self, X) -> np.ndarray:
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        return (np.asarray(X, dtype=float) - self.feature_means) * self.coef
+
+
+class TreeShap:
+    """
+    Exact interventional TreeSHAP for tree ensembles against a background sample, in probability
+    space (model_output="probability") so the values mean the same as the MLP's KernelExplainer
+    output: they sum to P(approved) minus the mean probability over the background.
+    shap.TreeExplainer is built on first use.
+    """
+
+    SUPPORTED = ("HistGradientBoostingClassifier", "GradientBoostingClassifier",
+                 "RandomForestClassifier", "ExtraTreesClassifier", "DecisionTreeClassifier")
+
+    def __init__(self, model, background):
+        self.model = model
+        self.background = np.asarray(background, dtype=float)
+        self._explainer = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def supports(cls, model) -> bool:
+        return type(model).__name__ in cls.SUPPORTED
+
+    def warm(self):
+        with self._lock:
+            if self._explainer is None:
+                import shap
+
+                self._explainer = shap.TreeExplainer(self.model, data=self.background, model_output="probability",
+                                                     feature_perturbation="interventional")
+        return self._explainer
+
+    def shap_values(self, X) -> np.ndarray:
+        explainer = self._explainer or self.warm()
+        X = X.toarray() if hasattr(X, "toarray") else np.asarray(X, dtype=float)
+        return positive_class(explainer.shap_values(X, check_additivity=False))
+
+
+# Explanation tiers for KernelExplainer: summarized background size (None = full background),
+# nsamples per row and a per-request time budget. "none" skips SHAP entirely.
+EXPLAIN_TIERS = {
+    "none": None,
+    "fast": {"background": 10, "nsamples": 128, "budget_ms": 250},
+    "full": {"background": None, "nsamples": "auto", "budget_ms": 5000},
+}
+
+
+def positive_class(shap_values) -> np.ndarray:
+    """Normalizes explainer output to an (n_rows, n_features) array for the positive class."""
+    # KernelExplainer returns one matrix per class (list) or a (rows, features, classes) array
+    if isinstance(shap_values, list):
+        shap_values = shap_values[1] if len(shap_values) == 2 else shap_values[0]
+    shap_values = np.asarray(shap_values)
+    if shap_values.ndim == 3:
+        shap_values = shap_values[:, :, 1]
+    return shap_values
+
+
+class TieredKernelExplainer:
+    """
+    One KernelExplainer per tier, built by warm() (or on first use, outside the time budget).
+    Rows are explained one by one while the next row is expected to fit in the tier's budget
+    (the per-row cost is measured at warm-up and after every row); the remaining rows come back
+    as NaN, and the report says how many were covered and whether the budget was kept.
+    """
+
+    def __init__(self, predict_fn, background, tiers: dict | None = None):
+        self.predict_fn = predict_fn
+        self.background = np.asarray(background)
+        self.tiers = tiers or EXPLAIN_TIERS
+        self._explainers = {}
+        self._row_s = {}  # last measured seconds per explained row, per tier
+        self._lock = threading.Lock()  # KernelExplainer keeps per-call state on the instance
+
+    def _explainer(self, tier: str):
+        if tier not in self._explainers:
+            import shap
+
+            k = self.tiers[tier]["background"]
+            if k and k < len(self.background):
+                data = shap.kmeans(self.background, k)  # weighted k-means summary
+            else:
+                data = self.background
+            self._explainers[tier] = shap.KernelExplainer(self.predict_fn, data)
+        return self._explainers[tier]
+
+    def _explain_row(self, explainer, row, tier: str):
+        start = time.perf_counter()
+        values = explainer.shap_values(row, nsamples=self.tiers[tier]["nsamples"], silent=True)
+        self._row_s[tier] = time.perf_counter() - start
+        return positive_class(values)[0]
+
+    def warm(self, tier: str | None = None):
+        """Builds the tier's explainer (every configured tier when tier is None) and times one row."""
+        tiers = [tier] if tier is not None else list(self.tiers)
+        for t in tiers:
+            if self.tiers.get(t) is None:
+                continue
+            with self._lock:
+                explainer = self._explainer(t)
+                if t not in self._row_s:
+                    self._explain_row(explainer, self.background[:1], t)
+
+    def background_size(self, tier: str) -> int:
+        k = self.tiers[tier]["background"]
+        return min(k, len(self.background)) if k else len(self.background)
+
+    def explain(self, X, tier: str):
+        cfg = self.tiers[tier]
+        X = X.toarray() if hasattr(X, "toarray") else np.asarray(X)
+        budget_s = cfg["budget_ms"] / 1000.0
+        out = np.full(X.shape, np.nan)
+        done = 0
+        with self._lock:
+            # construction is a one-off cost (warm() normally pays it at load time), not part of the budget
+            explainer = self._explainer(tier)
+            start = time.perf_counter()
+            for i in range(len(X)):
+                # stop before a row that is not expected to finish inside the budget
+                if time.perf_counter() - start + self._row_s.get(tier, 0.0) > budget_s:
+                    break
+                out[i] = self._explain_row(explainer, X[i:i + 1], tier)
+                done += 1
+            latency_ms = (time.perf_counter() - start) * 1000.0
+        return out, {
+            "tier": tier,
+            "latency_ms": round(latency_ms, 2),
+            "budget_ms": cfg["budget_ms"],
+            "nsamples": cfg["nsamples"],
+            "background_size": self.background_size(tier),
+            "rows_explained": done,
+            "complete": done == len(X) and latency_ms <= cfg["budget_ms"],
+        }
+
+
+# ---- process pool for KernelExplainer work ----
+# Each worker loads the model and background once (initializer) and keeps its own
+# TieredKernelExplainer, so explanations run on every core instead of behind the GIL.
+
+_worker_explainer = None
+_worker_barrier = None
+
+
+def _init_worker(model_path: str, background_path: str, warm_tiers: tuple, barrier=None):
+    global _worker_explainer, _worker_barrier
+    _worker_barrier = barrier
+    if os.path.isdir(model_path):
+        # array artifacts: every worker maps the same read-only pages
+        from agents.score_agent.artifacts import load_arrays
+
+        model, extras = load_arrays(model_path, mmap=True)
+        background = extras["background"]
+    else:
+        import joblib
+
+        model = joblib.load(model_path)
+        background = joblib.load(background_path)
+    _worker_explainer = TieredKernelExplainer(model.predict_proba, background)
+    for tier in warm_tiers:
+        _worker_explainer.warm(tier)
+
+
+def _explain_in_worker(X, tier: str):
+    return _worker_explainer.explain(X, tier)
+
+
+def _ping(timeout_s: float):
+    # a worker runs one task at a time, so the barrier only opens once `workers` distinct,
+    # initialized processes are waiting at it
+    _worker_barrier.wait(timeout_s)
+    return os.getpid()
+
+
+class ExplainerPool:
+    """
+    Bounded front for a ProcessPoolExecutor. submit() returns None instead of queueing
+    when max_pending explanations are already in flight, so callers can skip SHAP under load.
+    """
+
+    def __init__(self, workers: int, max_pending: int, model_path: str, background_path: str,
+                 warm_tiers: tuple = ()):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        # spawn: never fork a process that already runs server threads
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_path, background_path, tuple(warm_tiers), context.Barrier(workers)),
+        )
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, X, tier: str):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                return None
+            self._pending += 1
+            self.submitted += 1
+        X = X.toarray() if hasattr(X, "toarray") else np.asarray(X)
+        try:
+            future = self._executor.submit(_explain_in_worker, X, tier)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def warm(self, timeout_s: float = 600.0) -> list:
+        """
+        Starts every worker (and runs its initializer) ahead of the first request. Returns one
+        future per worker; they resolve to the worker PIDs only once all workers have started and
+        initialized, and fail (BrokenBarrierError) if that takes longer than timeout_s.
+        """
+        return [self._executor.submit(_ping, timeout_s) for _ in range(self.workers)]
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, cancel: bool = True):
+        # cancel=False lets already queued explanations finish (retiring a pool after a model swap)
+        self._executor.shutdown(wait=False, cancel_futures=cancel)
@@ -0,0 +1,342 @@
+"""
+Incremental updates of a score model from recorded loan outcomes.
+
+    python -m agents.score_agent.model.incremental [--model mlpClassifier] [--storage ./_ae_store]
+
+The evaluator stores every evaluated application as STORAGE_DIR/<applicant>/profiles/<loan>.json;
+POST /api/v1/applicants/{id}/outcome adds its final_outcome. This job streams the profiles labeled
+since the base model's watermark in chunks and, per chunk:
+
+  - updates the StandardScaler statistics (partial_fit) and folds the change into the model's first
+    layer, so the model computes exactly the same function before it learns anything new
+  - takes a few partial_fit epochs on the chunk plus an equal number of replayed training rows
+    (MLPClassifier.partial_fit; logistic regression through an SGD log-loss learner seeded with
+    its coefficients)
+
+One profile in five (by loan id) is held out. The update is only published, as a new registry
+version the running agents hot-swap, when accuracy and ROC AUC on the dataset's test split and on
+the held-out profiles are no worse than the base model's.
+
+The test split is only a fair gate when the base model never trained on it, so the base model's
+metrics must carry the same split key (written by python -m agents.score_agent.model.train);
+otherwise the job refuses to run unless --allow-split-mismatch is given.
+"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+import joblib
+import numpy as np
+
+from agents.score_agent.model.train import DATA_CSV, MODEL_INFO_DIR, SEED, evaluate, split_dataset, split_info
+from agents.score_agent.registry import REGISTRY_DIR, active_manifest, manifest_paths, model_info_paths, publish
+
+STORAGE_DIR = os.getenv("STORAGE_DIR", "./_ae_store")   # same default as the evaluator's settings
+CHUNK_ROWS = 512
+EPOCHS = 5
+REPLAY_RATIO = 1.0          # replayed training rows per new row, against forgetting
+HOLDOUT_EVERY = 5           # 1 in 5 labeled profiles is held out for the regression check
+MIN_HOLDOUT = 20            # fewer held-out profiles than this: only the test split is checked
+SGD_ETA0 = 0.01
+LABELS = {"Approved": 1, "Rejected": 0}
+
+
+def profile_record(profile: dict) -> dict:
+    """Stored profile -> the applicant dict the score agent scores (self_employed back to Yes/No)."""
+    record = dict(profile["features"])
+    se = record.get("self_employed")
+    record["self_employed"] = "Yes" if se is True or str(se).strip().lower() in {"yes", "y", "true", "1"} else "No"
+    return record
+
+
+def iter_outcomes(storage_dir: str = STORAGE_DIR, since: str = ""):
+    """Yields (outcome_recorded_at, loan_id, record, label) for profiles labeled after `since`, one file at a time."""
+    if not os.path.isdir(storage_dir):
+        return
+    for applicant in os.scandir(storage_dir):
+        profiles_dir = os.path.join(applicant.path, "profiles")
+        if not applicant.is_dir() or not os.path.isdir(profiles_dir):
+            continue
+        for entry in os.scandir(profiles_dir):
+            if not entry.name.endswith(".json") or entry.name.endswith(".explanation.json"):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    profile = json.load(f)
+            except (OSError, ValueError):
+                continue
+            recorded_at = profile.get("outcome_recorded_at") or ""
+            if profile.get("final_outcome") not in LABELS or recorded_at <= since:
+                continue
+            try:
+                record = profile_record(profile)
+            except (KeyError, TypeError):
+                continue
+            yield recorded_at, str(profile.get("loan_id", entry.name)), record, LABELS[profile["final_outcome"]]
+
+
+def _held_out(loan_id: str) -> bool:
+    return zlib.crc32(loan_id.encode()) % HOLDOUT_EVERY == 0
+
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _frame(records: list):
+    from agents.score_agent.bundle import _to_frame
+    return _to_frame(records)
+
+
+def _scaler_block(preprocessor):
+    """(fitted StandardScaler, its columns, its slice of the transformed output)."""
+    for name, trans, cols in preprocessor.transformers_:
+        if type(trans).__name__ == "StandardScaler":
+            return trans, list(cols), preprocessor.output_indices_[name]
+    raise ValueError("preprocessor has no StandardScaler")
+
+
+def _first_layer(model):
+    # (weights as (n_features, n_units), bias) of the layer that sees the scaled inputs
+    if type(model).__name__ == "MLPClassifier":
+        return model.coefs_[0], model.intercepts_[0]
+    return model.coef_.T, model.intercept_
+
+
+def _set_first_layer(model, W, b):
+    if type(model).__name__ == "MLPClassifier":
+        model.coefs_[0], model.intercepts_[0] = W, b
+    else:
+        model.coef_, model.intercept_ = W.T.copy(), b
+
+
+class IncrementalUpdater:
+    def __init__(self, model, preprocessor, background=None, feature_means=None, n_train: int | None = None):
+        self.model = copy.deepcopy(model)
+        self.preprocessor = copy.deepcopy(preprocessor)
+        self.background = None if background is None else np.array(background, dtype=float)
+        self.feature_means = None if feature_means is None else np.array(feature_means, dtype=float)
+        self.scaler, self.num_cols, self.num_slice = _scaler_block(self.preprocessor)
+        self.rows_seen = 0
+        self._sgd = None
+        if type(self.model).__name__ == "LogisticRegression":
+            from sklearn.linear_model import SGDClassifier
+
+            # same objective as the fitted model: log loss + L2 with alpha = 1 / (C * n)
+            n = n_train or int(self.scaler.n_samples_seen_)
+            self._sgd = SGDClassifier(loss="log_loss", alpha=1.0 / (self.model.C * n), learning_rate="constant",
+                                      eta0=SGD_ETA0, random_state=SEED)
+        elif not hasattr(self.model, "partial_fit"):
+            raise ValueError(f"{type(self.model).__name__} cannot be updated incrementally")
+
+    def update_scaler(self, df):
+        """New scaler statistics; the first layer (and the stored SHAP arrays) are re-expressed in them."""
+        old_mean, old_scale = self.scaler.mean_.copy(), self.scaler.scale_.copy()
+        self.scaler.partial_fit(df[self.num_cols])
+        # u_old = u_new * r + t on the scaled numeric columns
+        r = self.scaler.scale_ / old_scale
+        t = (self.scaler.mean_ - old_mean) / old_scale
+        W, b = _first_layer(self.model)
+        W, b = np.array(W, dtype=float), np.array(b, dtype=float)
+        b = b + t @ W[self.num_slice]
+        W[self.num_slice] = W[self.num_slice] * r[:, None]
+        _set_first_layer(self.model, W, b)
+        for arr in (self.background, self.feature_means):
+            if arr is not None:
+                arr[..., self.num_slice] = (arr[..., self.num_slice] - t) / r
+
+    def learn(self, X, y, epochs: int = EPOCHS):
+        rng = np.random.default_rng(SEED + self.rows_seen)
+        for _ in range(epochs):
+            order = rng.permutation(len(y))
+            if self._sgd is None:
+                self.model.partial_fit(X[order], y[order])
+            else:
+                self._sgd.coef_, self._sgd.intercept_ = self.model.coef_.copy(), self.model.intercept_.copy()
+                self._sgd.partial_fit(X[order], y[order], classes=self.model.classes_)
+                self.model.coef_, self.model.intercept_ = self._sgd.coef_.copy(), self._sgd.intercept_.copy()
+
+    def step(self, records: list, labels: list, replay=None, epochs: int = EPOCHS):
+        df = _frame(records)
+        self.update_scaler(df)
+        X, y = self.preprocessor.transform(df), np.asarray(labels)
+        if replay is not None:
+            X_replay, y_replay = replay
+            X = np.vstack([np.asarray(X), np.asarray(self.preprocessor.transform(X_replay))])
+            y = np.concatenate([y, np.asarray(y_replay)])
+        self.learn(np.asarray(X), y, epochs)
+        self.rows_seen += len(records)
+
+
+def _scores(model, preprocessor, X_df, y) -> dict | None:
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    if len(y) == 0:
+        return None
+    X = preprocessor.transform(X_df)
+    y = np.asarray(y)
+    out = {"rows": int(len(y)), "accuracy": float(accuracy_score(y, model.predict(X)))}
+    out["roc_auc"] = float(roc_auc_score(y, model.predict_proba(X)[:, 1])) if len(set(y)) == 2 else None
+    return out
+
+
+def _no_regression(before: dict | None, after: dict | None, tolerance: float) -> bool:
+    if before is None:
+        return True
+    return all(after[k] >= before[k] - tolerance for k in ("accuracy", "roc_auc") if before[k] is not None)
+
+
+def _base_paths(name: str, source: str, registry_dir: str, model_info_dir: str) -> tuple:
+    if source in ("auto", "registry"):
+        manifest = active_manifest(registry_dir)
+        if manifest and manifest["model_name"] == name:
+            return manifest_paths(manifest, registry_dir), manifest["version"]
+        if source == "registry":
+            raise FileNotFoundError(f"the active registry version is not a {name} model")
+    return model_info_paths(name, model_info_dir), f"model_info/{name}"
+
+
+def _write_version(out_dir: str, name: str, updater: IncrementalUpdater, metrics: dict) -> dict:
+    info_dir = os.path.join(out_dir, f"{name}_info")
+    os.makedirs(info_dir, exist_ok=True)
+    paths = model_info_paths(name, out_dir)
+    joblib.dump(updater.model, paths["model"])
+    joblib.dump(updater.preprocessor, paths["preprocessor"])
+    with open(paths["metrics"], "w") as f:
+        json.dump(metrics, f, indent=4)
+    if updater.background is not None:
+        joblib.dump(updater.background, paths["background"])
+    if updater.feature_means is not None:
+        joblib.dump(updater.feature_means, paths["feature_means"])
+    try:
+        from agents.score_agent.artifacts import convert_model_info
+        convert_model_info(info_dir)
+    except Exception as e:
+        print(f"{name}: no memory-mapped arrays ({e})")
+    return paths
+
+
+def run(name: str = "mlpClassifier", storage_dir: str = STORAGE_DIR, csv_path: str = DATA_CSV,
+        source: str = "auto", registry_dir: str = REGISTRY_DIR, model_info_dir: str = MODEL_INFO_DIR,
+        out_dir: str | None = None, publish_version: bool = True, epochs: int = EPOCHS,
+        tolerance: float = 0.0, allow_split_mismatch: bool = False) -> dict:
+    start = time.perf_counter()
+    paths, base_version = _base_paths(name, source, registry_dir, model_info_dir)
+    with open(paths["metrics"]) as f:
+        base_metrics = json.load(f)
+
+    # the base model's training rows must not be in the test split the gate measures on
+    split = split_info(csv_path)
+    base_split = (base_metrics.get("split") or {}).get("key")
+    split_matches = base_split == split["key"]
+    if not split_matches:
+        message = (f"{base_version} was evaluated on split {base_split or 'unknown'}, not {split['key']} "
+                   f"({csv_path}); its training rows may overlap the test split of the regression check")
+        if not allow_split_mismatch:
+            raise ValueError(f"{message}. Retrain it first: python -m agents.score_agent.model.train "
+                             f"--models {name}")
+        print(f"WARNING: {message}")
+    model = joblib.load(paths["model"])
+    preprocessor = joblib.load(paths["preprocessor"])
+    extras = {k: joblib.load(paths[k]) for k in ("background", "feature_means") if os.path.exists(paths.get(k, ""))}
+    since = base_metrics.get("incremental", {}).get("profiles_through", "")
+
+    X_train, X_test, y_train, y_test = split_dataset(csv_path)
+    updater = IncrementalUpdater(model, preprocessor, n_train=len(X_train), **extras)
+    rng = np.random.default_rng(SEED)
+
+    watermark, n_new = since, 0
+    held_records, held_labels = [], []
+    for chunk in _chunks(iter_outcomes(storage_dir, since), CHUNK_ROWS):
+        watermark = max([watermark] + [row[0] for row in chunk])
+        learn = [row for row in chunk if not _held_out(row[1])]
+        for row in chunk:
+            if _held_out(row[1]):
+                held_records.append(row[2])
+                held_labels.append(row[3])
+        if not learn:
+            continue
+        n_replay = min(len(X_train), int(len(learn) * REPLAY_RATIO))
+        idx = rng.choice(len(X_train), n_replay, replace=False)
+        updater.step([row[2] for row in learn], [row[3] for row in learn],
+                     (X_train.iloc[idx], y_train.iloc[idx]), epochs)
+        n_new += len(learn)
+
+    summary = {"base_version": base_version, "since": since, "profiles_through": watermark,
+               "new_rows": n_new, "held_out_rows": len(held_labels), "split_matches": split_matches}
+    if n_new == 0:
+        print(f"No newly labeled profiles in {storage_dir} since {since or 'the start'}; nothing to do")
+        return {**summary, "published": False}
+
+    checks = {"test_split": (_scores(model, preprocessor, X_test, y_test),
+                             _scores(updater.model, updater.preprocessor, X_test, y_test))}
+    if len(held_labels) >= MIN_HOLDOUT:
+        held_df = _frame(held_records)
+        checks["held_out_profiles"] = (_scores(model, preprocessor, held_df, held_labels),
+                                       _scores(updater.model, updater.preprocessor, held_df, held_labels))
+    summary["checks"] = {k: {"before": b, "after": a} for k, (b, a) in checks.items()}
+    summary["elapsed_s"] = round(time.perf_counter() - start, 2)
+    for k, (b, a) in checks.items():
+        print(f"{k}: accuracy {b['accuracy']:.4f} -> {a['accuracy']:.4f}, roc_auc {b['roc_auc']} -> {a['roc_auc']}")
+
+    if not all(_no_regression(b, a, tolerance) for b, a in checks.values()):
+        print(f"Update from {n_new} new rows regresses a held-out metric; keeping {base_version}")
+        return {**summary, "published": False}
+
+    metrics = evaluate(updater.model, updater.preprocessor.transform(X_test), y_test)
+    metrics["incremental"] = summary
+    if split_matches:
+        # only a clean base carries the key on, so a forced update has to be forced again next time
+        metrics["split"] = split
+    tmp_dir = None
+    if out_dir is None:
+        tmp_dir = out_dir = tempfile.mkdtemp(prefix=f"{name}-incremental-")
+    try:
+        new_paths = _write_version(out_dir, name, updater, metrics)
+        manifest = publish(name, new_paths, registry_dir) if publish_version else None
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    summary["published"] = manifest["version"] if manifest else False
+    print(f"Updated {name} with {n_new} new rows in {summary['elapsed_s']}s"
+          + (f", published {manifest['version']}" if manifest else f", written to {out_dir}"))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update a score model from recorded loan outcomes")
+    parser.add_argument("--model", default="mlpClassifier", choices=["mlpClassifier", "logisticRegression"])
+    parser.add_argument("--storage", default=STORAGE_DIR, help="evaluator STORAGE_DIR")
+    parser.add_argument("--csv", default=DATA_CSV, help="dataset for the replay rows and the test split")
+    parser.add_argument("--source", default="auto", choices=["auto", "registry", "model_info"],
+                        help="base model: active registry version (auto: when it is this model) or model_info")
+    parser.add_argument("--registry", default=os.getenv("SCORE_REGISTRY_DIR", REGISTRY_DIR))
+    parser.add_argument("--out", default=None, help="also keep the new version in this model_info-style folder")
+    parser.add_argument("--no-publish", action="store_true")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--tolerance", type=float, default=0.0, help="allowed metric drop")
+    parser.add_argument("--allow-split-mismatch", action="store_true",
+                        help="run even when the base model was not trained on the dataset's train split")
+    args = parser.parse_args()
+    try:
+        run(args.model, args.storage, args.csv, args.source, args.registry, out_dir=args.out,
+            publish_version=not args.no_publish, epochs=args.epochs, tolerance=args.tolerance,
+            allow_split_mismatch=args.allow_split_mismatch)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+One training entry point for the score agent models.
+
+    python -m agents.score_agent.model.train                        # every candidate
+    python -m agents.score_agent.model.train --models mlpClassifier --workers 2
+    python -m agents.score_agent.model.train --models mlpClassifier --search     # tuned MLP
+
+The CSV is parsed, split and preprocessed once; the split matrices and the fitted preprocessor
+are cached under data/cache/score-<hash>/ (keyed by the CSV contents and the split / preprocessing
+settings), so later runs start from .npy files. Each candidate is then fitted in its own process
+on the memory-mapped matrices and writes its model_info/<name>_info folder: model, preprocessor,
+metrics, SHAP background, training feature means and the memory-mapped arrays.
+
+Adding a model means adding a factory to CANDIDATES.
+
+--search replaces the fixed configuration of the models in SEARCH_SPACES with a cross-validated
+successive-halving search (HalvingRandomSearchCV over all cores): every candidate starts on a
+small share of the training rows and only the best third moves on to three times as many. The
+refitted winner is evaluated and saved like any other model, with the search summary in its metrics.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import (
+    accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, roc_auc_score, classification_report
+)
+from sklearn.neural_network import MLPClassifier
+
+DATA_CSV = "data/raw/loan_approval_dataset.csv"
+CACHE_DIR = "data/cache"
+MODEL_INFO_DIR = "agents/score_agent/model/model_info"
+TEST_SIZE = 0.2
+SEED = 42
+BACKGROUND_PER_CLASS = 75  # 150 SHAP background rows in total
+# bump when the parsing / split / preprocessor below changes, so old caches are not reused
+PREP_VERSION = 2
+
+CANDIDATES = {
+    "logisticRegression": lambda: LogisticRegression(max_iter=500, random_state=SEED),
+    "mlpClassifier": lambda: MLPClassifier(hidden_layer_sizes=(100, 50), max_iter=500, random_state=SEED),
+    "histGradientBoosting": lambda: HistGradientBoostingClassifier(
+        max_iter=300, learning_rate=0.1, early_stopping=True, validation_fraction=0.1, n_iter_no_change=20,
+        random_state=SEED),
+}
+
+SEARCH_CANDIDATES = 48
+SEARCH_CV = 5
+SEARCH_SCORING = "roc_auc"
+
+
+def _mlp_search_space():
+    from scipy.stats import loguniform
+
+    # early stopping on a held-out 10% of each fit, so no configuration runs all 500 epochs for nothing
+    base = MLPClassifier(max_iter=500, early_stopping=True, validation_fraction=0.1, n_iter_no_change=20,
+                         random_state=SEED)
+    return base, {
+        "hidden_layer_sizes": [(50,), (100,), (64, 32), (100, 50), (128, 64), (200, 100), (128, 64, 32)],
+        "alpha": loguniform(1e-6, 1e-1),
+        "learning_rate_init": loguniform(1e-4, 3e-2),
+    }
+
+
+SEARCH_SPACES = {
+    "mlpClassifier": _mlp_search_space,
+}
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_dataset(csv_path: str = DATA_CSV):
+    """CSV -> (features DataFrame, 0/1 target) with the column / value stripping the agent applies."""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+
+    # Strip whitespace from column names and string values
+    df.columns = df.columns.str.strip()
+    for col in df.select_dtypes(exclude='number').columns:
+        df[col] = df[col].str.strip()
+
+    # Target variable
+    y = df['loan_status'].map({'Approved': 1, 'Rejected': 0})
+    print("Missing target values:", y.isnull().sum())
+
+    # Features (loan_id is an identifier, not a feature)
+    X = df.drop(['loan_status', 'loan_id'], axis=1, errors='ignore')
+    return X, y
+
+
+def build_preprocessor(X):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    # (select by "number" so string columns are found under both the object and the pandas 3 str dtype)
+    categorical_cols = X.select_dtypes(exclude='number').columns.tolist()
+    numeric_cols = X.select_dtypes(include='number').columns.tolist()
+    return ColumnTransformer(transformers=[
+        ('num', StandardScaler(), numeric_cols),
+        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_cols)
+    ])
+
+
+def split_info(csv_path: str = DATA_CSV, csv_sha256: str | None = None) -> dict:
+    """Identifies the split_dataset split; metrics with the same key come from the same test rows."""
+    csv_sha256 = csv_sha256 or _sha256(csv_path)
+    key = hashlib.sha256(f"{csv_sha256}:{TEST_SIZE}:{SEED}:stratified".encode()).hexdigest()[:16]
+    return {"key": key, "test_size": TEST_SIZE, "seed": SEED, "stratified": True}
+
+
+def split_dataset(csv_path: str = DATA_CSV):
+    """Raw X_train, X_test, y_train, y_test (the split every score model is trained and compared on)."""
+    from sklearn.model_selection import train_test_split
+
+    X, y = load_dataset(csv_path)
+    return train_test_split(X, y, test_size=TEST_SIZE, stratify=y, random_state=SEED)
+
+
+def prepare(csv_path: str = DATA_CSV, cache_dir: str = CACHE_DIR) -> str:
+    """Folder with X_train/X_test/y_train/y_test .npy files, the fitted preprocessor and split.json (built on a cache miss)."""
+    csv_sha256 = _sha256(csv_path)
+    key = hashlib.sha256(f"{csv_sha256}:{TEST_SIZE}:{SEED}:{PREP_VERSION}".encode()).hexdigest()[:16]
+    split_dir = os.path.join(cache_dir, f"score-{key}")
+    if os.path.exists(os.path.join(split_dir, "preprocessor.pkl")):
+        print(f"Using cached split {split_dir}")
+        return split_dir
+
+    start = time.perf_counter()
+    X_train, X_test, y_train, y_test = split_dataset(csv_path)
+
+    # Fit preprocessor on training data, transform both train & test
+    preprocessor = build_preprocessor(X_train)
+    matrices = {
+        "X_train": preprocessor.fit_transform(X_train),
+        "X_test": preprocessor.transform(X_test),
+        "y_train": y_train.to_numpy(),
+        "y_test": y_test.to_numpy(),
+    }
+
+    tmp_dir = f"{split_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, values in matrices.items():
+        values = values.toarray() if hasattr(values, "toarray") else values
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(values))
+    joblib.dump(preprocessor, os.path.join(tmp_dir, "preprocessor.pkl"))
+    with open(os.path.join(tmp_dir, "split.json"), "w") as f:
+        json.dump(split_info(csv_path, csv_sha256), f, indent=2)
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        os.rename(tmp_dir, split_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)  # another run cached the same split first
+    print(f"Preprocessed {len(X_train) + len(X_test)} rows in {time.perf_counter() - start:.2f}s -> {split_dir}")
+    return split_dir
+
+
+def load_split(split_dir: str) -> dict:
+    return {name: np.load(os.path.join(split_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ("X_train", "X_test", "y_train", "y_test")}
+
+
+def evaluate(model, X_test, y_test) -> dict:
+    y_pred = model.predict(X_test)
+    y_prob = model.predict_proba(X_test)[:, 1]
+    return {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred),
+        "recall": recall_score(y_test, y_pred),
+        "f1_score": f1_score(y_test, y_pred),
+        "roc_auc": roc_auc_score(y_test, y_prob),
+        "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),  # convert to list for JSON
+        "classification_report": classification_report(y_test, y_pred, target_names=["Rejected", "Approved"], output_dict=True)
+    }
+
+
+def shap_background(X_train, y_train, per_class: int = BACKGROUND_PER_CLASS, seed: int = SEED) -> np.ndarray:
+    """Class-balanced rows of the transformed training matrix."""
+    rng = np.random.default_rng(seed)
+    approved_idx = np.flatnonzero(np.asarray(y_train) == 1)
+    rejected_idx = np.flatnonzero(np.asarray(y_train) == 0)
+    approved_sample = X_train[np.sort(rng.choice(approved_idx, per_class, replace=False))]
+    rejected_sample = X_train[np.sort(rng.choice(rejected_idx, per_class, replace=False))]
+    return np.vstack([approved_sample, rejected_sample])
+
+
+def save_model_info(name: str, model, split_dir: str, metrics: dict, model_info_dir: str = MODEL_INFO_DIR,
+                    arrays: bool = True) -> str:
+    """Writes model_info/<name>_info the way the score agent and the registry expect it."""
+    split = load_split(split_dir)
+    info_dir = os.path.join(model_info_dir, f"{name}_info")
+    os.makedirs(info_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(info_dir, f"{name}.pkl"))
+    shutil.copy2(os.path.join(split_dir, "preprocessor.pkl"), os.path.join(info_dir, f"{name}_preprocessor.pkl"))
+    with open(os.path.join(info_dir, f"{name}_metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=4)
+    joblib.dump(shap_background(split["X_train"], split["y_train"]), os.path.join(info_dir, f"{name}_background.pkl"))
+    # Training feature means (transformed space) for the closed-form linear SHAP in the score agent
+    joblib.dump(np.asarray(split["X_train"]).mean(axis=0), os.path.join(info_dir, f"{name}_feature_means.pkl"))
+
+    from agents.score_agent.compiled import can_compile
+    # models the compiled kernel does not cover (trees) are served from the pickles
+    if arrays and can_compile(model):
+        from agents.score_agent.artifacts import convert_model_info
+        try:
+            convert_model_info(info_dir)
+        except Exception as e:
+            print(f"{name}: no memory-mapped arrays ({e})")
+    return info_dir
+
+
+def search(name: str, X_train, y_train, n_candidates: int = SEARCH_CANDIDATES):
+    """Successive-halving random search; returns the winner (refitted on all of X_train) and a summary."""
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold
+
+    base, space = SEARCH_SPACES[name]()
+    searcher = HalvingRandomSearchCV(
+        base, space,
+        n_candidates=n_candidates,
+        factor=3,
+        min_resources="exhaust",      # smallest budget so the last round sees (nearly) all rows
+        cv=StratifiedKFold(SEARCH_CV, shuffle=True, random_state=SEED),
+        scoring=SEARCH_SCORING,
+        n_jobs=-1,
+        random_state=SEED,
+    )
+    searcher.fit(np.asarray(X_train), np.asarray(y_train))
+    summary = {
+        "scoring": SEARCH_SCORING,
+        "cv_score": float(searcher.best_score_),
+        "best_params": {k: (list(v) if isinstance(v, tuple) else v.item() if hasattr(v, "item") else v)
+                        for k, v in searcher.best_params_.items()},
+        "n_candidates": int(searcher.n_candidates_[0]),
+        "n_iterations": int(searcher.n_iterations_),
+        "resources": [int(r) for r in searcher.n_resources_],
+        "epochs": int(searcher.best_estimator_.n_iter_),
+    }
+    return searcher.best_estimator_, summary
+
+
+def fit_candidate(name: str, split_dir: str, model_info_dir: str = MODEL_INFO_DIR, arrays: bool = True,
+                  search_candidates: int = 0) -> dict:
+    """
+    Runs in a worker process: fit one candidate on the cached split and write its artifacts
+    (search_candidates > 0 runs the hyperparameter search for models that have a search space).
+    """
+    split = load_split(split_dir)
+    start = time.perf_counter()
+    summary = None
+    if search_candidates and name in SEARCH_SPACES:
+        model, summary = search(name, split["X_train"], split["y_train"], search_candidates)
+    else:
+        model = CANDIDATES[name]()
+        model.fit(split["X_train"], split["y_train"])
+    fit_s = time.perf_counter() - start
+    metrics = evaluate(model, split["X_test"], split["y_test"])
+    # which test rows these numbers come from (the incremental updater's regression gate checks it)
+    with open(os.path.join(split_dir, "split.json")) as f:
+        metrics["split"] = json.load(f)
+    if summary:
+        metrics["search"] = summary
+        print(f"{name}: search picked {summary['best_params']} (cv {SEARCH_SCORING} {summary['cv_score']:.4f})")
+    save_model_info(name, model, split_dir, metrics, model_info_dir, arrays)
+    return {"model": name, "fit_s": round(fit_s, 2), "accuracy": metrics["accuracy"], "roc_auc": metrics["roc_auc"]}
+
+
+def train(names: list | None = None, csv_path: str = DATA_CSV, workers: int | None = None,
+          model_info_dir: str = MODEL_INFO_DIR, arrays: bool = True, search_candidates: int = 0) -> list:
+    names = names or list(CANDIDATES)
+    unknown = [n for n in names if n not in CANDIDATES]
+    if unknown:
+        raise ValueError(f"unknown models {unknown}, choose from {sorted(CANDIDATES)}")
+    split_dir = prepare(csv_path)
+    with ProcessPoolExecutor(max_workers=workers or min(len(names), os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(fit_candidate, n, split_dir, model_info_dir, arrays, search_candidates) for n in names]
+        return [f.result() for f in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the score agent models")
+    parser.add_argument("--models", default=",".join(CANDIDATES), help="comma separated, from: " + ", ".join(CANDIDATES))
+    parser.add_argument("--csv", default=DATA_CSV)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=MODEL_INFO_DIR, help="model_info folder")
+    parser.add_argument("--no-arrays", action="store_true", help="skip the memory-mapped array conversion")
+    parser.add_argument("--search", action="store_true",
+                        help="hyperparameter search for: " + ", ".join(SEARCH_SPACES))
+    parser.add_argument("--search-candidates", type=int, default=SEARCH_CANDIDATES)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = train(args.models.split(","), args.csv, args.workers, args.out, not args.no_arrays,
+                    args.search_candidates if args.search else 0)
+    for r in results:
+        print(f"{r['model']}: accuracy={r['accuracy']:.4f} roc_auc={r['roc_auc']:.4f} (fit {r['fit_s']}s)")
+    print(f"Trained {len(results)} models in {time.perf_counter() - start:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Versioned model registry for the score agent.
+
+    agents/score_agent/model/registry/            (SCORE_REGISTRY_DIR)
+        mlpClassifier-b97966317414/
+            manifest.json     model name, version, created_at, files and their sha256 (every array file), metrics
+            mlpClassifier.pkl, mlpClassifier_preprocessor.pkl, ..., arrays/
+        ACTIVE                optional: pins a version (rollback); otherwise the newest version wins
+
+A version is written to a temporary folder and renamed into place, so a watching worker never
+sees half of one. Workers poll the registry (RegistryWatcher), load + warm a new version in the
+background and swap it in.
+
+    python -m agents.score_agent.registry publish                  # best model_info model by accuracy
+    python -m agents.score_agent.registry publish mlpClassifier
+    python -m agents.score_agent.registry list
+    python -m agents.score_agent.registry activate <version>       # pin (rollback); "latest" unpins
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from agents.score_agent.artifacts import ARRAYS_DIRNAME, array_files, read_layout
+from agents.score_agent.cache import artifact_version
+
+MODEL_INFO_DIR = "agents/score_agent/model/model_info"
+REGISTRY_DIR = "agents/score_agent/model/registry"
+MANIFEST_FILE = "manifest.json"
+ACTIVE_FILE = "ACTIVE"
+
+
+def model_info_paths(name: str, model_info_dir: str = MODEL_INFO_DIR) -> dict:
+    """Artifact paths of a model trained into model_info/<name>_info (the training scripts' naming)."""
+    info_dir = os.path.join(model_info_dir, f"{name}_info")
+    return {
+        "model": os.path.join(info_dir, f"{name}.pkl"),
+        "preprocessor": os.path.join(info_dir, f"{name}_preprocessor.pkl"),
+        "metrics": os.path.join(info_dir, f"{name}_metrics.json"),
+        "background": os.path.join(info_dir, f"{name}_background.pkl"),
+        "feature_means": os.path.join(info_dir, f"{name}_feature_means.pkl"),
+        "arrays": os.path.join(info_dir, ARRAYS_DIRNAME),
+    }
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_manifest(version_dir: str) -> dict:
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def list_versions(registry_dir: str = REGISTRY_DIR) -> list:
+    """Every published manifest, oldest first."""
+    if not os.path.isdir(registry_dir):
+        return []
+    manifests = []
+    for entry in os.listdir(registry_dir):
+        if entry.startswith(".") or not os.path.exists(os.path.join(registry_dir, entry, MANIFEST_FILE)):
+            continue
+        manifests.append(read_manifest(os.path.join(registry_dir, entry)))
+    return sorted(manifests, key=lambda m: m["created_at"])
+
+
+def active_manifest(registry_dir: str = REGISTRY_DIR) -> dict | None:
+    """The pinned version (ACTIVE file) or else the newest one; None for an empty registry."""
+    pin_path = os.path.join(registry_dir, ACTIVE_FILE)
+    if os.path.exists(pin_path):
+        with open(pin_path) as f:
+            pinned = f.read().strip()
+        if pinned and os.path.exists(os.path.join(registry_dir, pinned, MANIFEST_FILE)):
+            return read_manifest(os.path.join(registry_dir, pinned))
+        print(f"Registry pin '{pinned}' not found, using the newest version")
+    versions = list_versions(registry_dir)
+    return versions[-1] if versions else None
+
+
+def manifest_paths(manifest: dict, registry_dir: str = REGISTRY_DIR) -> dict:
+    version_dir = os.path.join(registry_dir, manifest["version"])
+    return {kind: os.path.join(version_dir, filename) for kind, filename in manifest["files"].items()}
+
+
+def _array_hashes(arrays_dir: str) -> dict:
+    """{file name: sha256} for the layout and every .npy file it references."""
+    return {os.path.basename(path): _sha256(path) for path in array_files(arrays_dir)}
+
+
+def verify_manifest(manifest: dict, registry_dir: str = REGISTRY_DIR):
+    """Raises ValueError when a file no longer matches the hash recorded at publish time."""
+    for kind, path in manifest_paths(manifest, registry_dir).items():
+        expected = manifest["sha256"][kind]
+        if kind != "arrays":
+            if _sha256(path) != expected:
+                raise ValueError(f"{manifest['version']}: {kind} does not match its manifest hash")
+            continue
+        if not isinstance(expected, dict):
+            raise ValueError(f"{manifest['version']}: arrays have no per-file hashes, publish the model again")
+        actual = _array_hashes(path)
+        changed = sorted(name for name in expected.keys() | actual.keys() if expected.get(name) != actual.get(name))
+        if changed:
+            raise ValueError(f"{manifest['version']}: arrays {changed} do not match their manifest hashes")
+
+
+def publish(name: str, paths: dict | None = None, registry_dir: str = REGISTRY_DIR) -> dict:
+    """Copies one trained model into a new registry version; publishing the same artifacts twice is a no-op."""
+    paths = paths or model_info_paths(name)
+    version = f"{name}-{artifact_version([paths['model'], paths['preprocessor']])}"
+    version_dir = os.path.join(registry_dir, version)
+    if os.path.exists(os.path.join(version_dir, MANIFEST_FILE)):
+        print(f"{version} is already published")
+        return read_manifest(version_dir)
+
+    tmp_dir = os.path.join(registry_dir, f".tmp-{version}-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    files, hashes = {}, {}
+    for kind, src in paths.items():
+        if not os.path.exists(src):
+            continue
+        dst = os.path.basename(src)
+        if kind == "arrays":
+            # only arrays converted from exactly these pickles
+            if read_layout(src).get("source_version") != version.split("-", 1)[1]:
+                print(f"skipping stale {src}")
+                continue
+            shutil.copytree(src, os.path.join(tmp_dir, dst))
+            hashes[kind] = _array_hashes(os.path.join(tmp_dir, dst))
+        else:
+            shutil.copy2(src, os.path.join(tmp_dir, dst))
+            hashes[kind] = _sha256(src)
+        files[kind] = dst
+
+    with open(paths["metrics"]) as f:
+        metrics = json.load(f)
+    manifest = {
+        "model_name": name,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "files": files,
+        "sha256": hashes,
+        "metrics": metrics,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(tmp_dir, version_dir)
+    print(f"Published {version} to {registry_dir}")
+    return manifest
+
+
+def activate(version: str, registry_dir: str = REGISTRY_DIR):
+    pin_path = os.path.join(registry_dir, ACTIVE_FILE)
+    if version == "latest":
+        if os.path.exists(pin_path):
+            os.remove(pin_path)
+        return
+    if not os.path.exists(os.path.join(registry_dir, version, MANIFEST_FILE)):
+        raise FileNotFoundError(f"no version {version} in {registry_dir}")
+    tmp_path = f"{pin_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, pin_path)
+
+
+class RegistryWatcher:
+    """
+    Polls the registry every poll_s seconds. When the active version changes, on_version(manifest)
+    loads, warms and swaps it in (in this thread, never on a request). A version that fails to load
+    is not retried until the registry points somewhere else.
+    """
+
+    def __init__(self, registry_dir: str, on_version, current_version: str | None, poll_s: float = 10.0):
+        self.registry_dir = registry_dir
+        self.on_version = on_version
+        self.current_version = current_version
+        self.poll_s = poll_s
+        self.reloads = 0
+        self.last_check = None
+        self.last_error = None
+        self._failed_version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self) -> bool:
+        """One poll; True when a new version was swapped in."""
+        with self._lock:
+            self.last_check = time.time()
+            try:
+                manifest = active_manifest(self.registry_dir)
+            except Exception as e:
+                self.last_error = f"reading registry: {e}"
+                return False
+            if manifest is None or manifest["version"] in (self.current_version, self._failed_version):
+                return False
+            try:
+                self.on_version(manifest)
+            except Exception as e:
+                self._failed_version = manifest["version"]
+                self.last_error = f"{manifest['version']}: {e}"
+                print(f"Model reload failed, keeping {self.current_version}: {e}")
+                return False
+            self.current_version = manifest["version"]
+            self._failed_version = None
+            self.last_error = None
+            self.reloads += 1
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_s):
+            self.check()
+
+    def start(self):
+        if self._thread is None and self.poll_s > 0:
+            self._thread = threading.Thread(target=self._run, name="score-registry-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "registry_dir": self.registry_dir,
+            "poll_s": self.poll_s,
+            "watching": self._thread is not None and not self._stop.is_set(),
+            "reloads": self.reloads,
+            "last_check": (time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.last_check))
+                           if self.last_check else None),
+            "last_error": self.last_error,
+        }
+
+
+def _best_model_info() -> str:
+    best, best_accuracy = None, -1.0
+    for entry in sorted(os.listdir(MODEL_INFO_DIR)):
+        name = entry.removesuffix("_info")
+        metrics_path = model_info_paths(name)["metrics"]
+        if entry.endswith("_info") and os.path.exists(metrics_path):
+            with open(metrics_path) as f:
+                accuracy = json.load(f)["accuracy"]
+            if accuracy > best_accuracy:
+                best, best_accuracy = name, accuracy
+    return best
+
+
+def main(argv: list) -> None:
+    registry_dir = os.getenv("SCORE_REGISTRY_DIR", REGISTRY_DIR)
+    command = argv[0] if argv else "list"
+    if command == "publish":
+        names = argv[1:] or [_best_model_info()]
+        for name in names:
+            publish(name, registry_dir=registry_dir)
+    elif command == "activate" and len(argv) == 2:
+        activate(argv[1], registry_dir)
+    elif command == "list":
+        active = active_manifest(registry_dir)
+        for m in list_versions(registry_dir):
+            marker = "*" if active and m["version"] == active["version"] else " "
+            print(f"{marker} {m['version']}  {m['created_at']}  accuracy={m['metrics'].get('accuracy')}")
+    else:
+        raise SystemExit(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,121 +1,520 @@
-from fastapi import FastAPI
-import pandas as pd
-import joblib
-import json
-import os
-import shap
-import numpy as np
+import time
 
-app = FastAPI()
+# Startup timing report: every expensive import-time step is recorded here (GET /startup)
+_IMPORT_STARTED = time.perf_counter()
+STARTUP_TIMINGS = {}
 
 
-###Creating a dictionary with all models info
+class _timed:
+    def __init__(self, step: str):
+        self.step = step
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        STARTUP_TIMINGS[self.step] = round((time.perf_counter() - self.start) * 1000.0, 2)
+
+
+with _timed("import:fastapi"):
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.concurrency import run_in_threadpool
+
+with _timed("import:numpy"):
+    import json
+    import os
+    import threading
+    import numpy as np
+
+from agents.score_agent.artifacts import LAYOUT_FILE
+from agents.score_agent.batching import MicroBatcher
+from agents.score_agent.bundle import ModelBundle
+from agents.score_agent.cache import InMemoryCache, build_cache, canonical_key
+from agents.score_agent.explain import EXPLAIN_TIERS, ExplainerPool
+from agents.score_agent.shadow import ShadowScorer
+from agents.score_agent.registry import RegistryWatcher, active_manifest, manifest_paths, verify_manifest
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    bundle = active_bundle
+    if bundle.explainer_pool is not None:
+        # startup completes only once every worker has loaded the model and built its explainers,
+        # so the first requests do not time out behind the initializers
+        with _timed("warmup:explainer_pool"):
+            await run_in_threadpool(lambda: [f.result() for f in bundle.explainer_pool.warm()])
+    elif (bundle.mlp_explainer is not None or bundle.tree_explainer is not None) and SCORE_WARMUP == "background":
+        # build the KernelExplainer off the import path; requests before it is ready build it themselves
+        threading.Thread(target=_warm_explainer, args=(bundle,), name="score-explainer-warmup", daemon=True).start()
+    registry_watcher.start()
+    yield
+    registry_watcher.stop()
+    if active_bundle.explainer_pool is not None:
+        active_bundle.explainer_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+MODEL_INFO_DIR = "agents/score_agent/model/model_info"
+
+# SCORE_STARTUP_MODE=fast loads only the winning model's artifacts; "full" loads every model up front
+SCORE_STARTUP_MODE = os.getenv("SCORE_STARTUP_MODE", "fast")
+# SCORE_WARMUP: "background" builds the explainer in a startup thread, "eager" at import, "lazy" on first use
+SCORE_WARMUP = os.getenv("SCORE_WARMUP", "background")
+# warn when the import takes longer than this (0 = no budget)
+SCORE_IMPORT_BUDGET_MS = float(os.getenv("SCORE_IMPORT_BUDGET_MS", "0"))
+# Compiled NumPy inference (SCORE_INFERENCE=sklearn keeps the DataFrame + sklearn path)
+SCORE_INFERENCE = os.getenv("SCORE_INFERENCE", "compiled")
+# SCORE_ARTIFACTS: "arrays" serves from memory-mapped .npy files (shared page cache between workers),
+# "pickle" from the joblib pickles, "auto" uses arrays when they exist and match the pickles
+SCORE_ARTIFACTS = os.getenv("SCORE_ARTIFACTS", "auto")
+# Versioned registry (python -m agents.score_agent.registry publish). When it holds a version the
+# agent serves it and polls every SCORE_REGISTRY_POLL_S seconds for a new one (0 = no hot reload).
+SCORE_REGISTRY_DIR = os.getenv("SCORE_REGISTRY_DIR", "agents/score_agent/model/registry")
+SCORE_REGISTRY_POLL_S = float(os.getenv("SCORE_REGISTRY_POLL_S", "10"))
+
+# Default explanation tier when a request does not pick one (none | fast | full)
+DEFAULT_EXPLAIN_TIER = os.getenv("SCORE_EXPLAIN_TIER", "full")
+
+# KernelExplainer work can go to a process pool (SCORE_SHAP_WORKERS=0 keeps it in-process).
+# At most SCORE_SHAP_MAX_PENDING explanations are in flight; beyond that SHAP is skipped.
+SCORE_SHAP_WORKERS = int(os.getenv("SCORE_SHAP_WORKERS", "0"))
+SCORE_SHAP_MAX_PENDING = int(os.getenv("SCORE_SHAP_MAX_PENDING", str(2 * max(SCORE_SHAP_WORKERS, 1))))
+SCORE_SHAP_GRACE_S = float(os.getenv("SCORE_SHAP_GRACE_S", "1.0"))  # wait on top of the tier budget
+
+###Creating a dictionary with all models info (artifact paths; loaded on demand by load_model)
 models_info = {
     "logisticRegression": {
-        "model": joblib.load("agents/score_agent/model/model_info/logisticRegression_info/logisticRegression.pkl"),
-        "preprocessor": joblib.load("agents/score_agent/model/model_info/logisticRegression_info/logisticRegression_preprocessor.pkl"),
-        "metrics": json.load(open("agents/score_agent/model/model_info/logisticRegression_info/logisticRegression_metrics.json"))
+        "model": f"{MODEL_INFO_DIR}/logisticRegression_info/logisticRegression.pkl",
+        "preprocessor": f"{MODEL_INFO_DIR}/logisticRegression_info/logisticRegression_preprocessor.pkl",
+        "metrics": f"{MODEL_INFO_DIR}/logisticRegression_info/logisticRegression_metrics.json",
+        "feature_means": f"{MODEL_INFO_DIR}/logisticRegression_info/logisticRegression_feature_means.pkl",
+        "arrays": f"{MODEL_INFO_DIR}/logisticRegression_info/arrays"
     },
     "mlpClassifier": {
-        "model": joblib.load("agents/score_agent/model/model_info/mlpClassifier_info/mlpClassifier.pkl"),
-        "preprocessor": joblib.load("agents/score_agent/model/model_info/mlpClassifier_info/mlpClassifier_preprocessor.pkl"), 
-        "metrics": json.load(open("agents/score_agent/model/model_info/mlpClassifier_info/mlpClassifier_metrics.json")),
-        "background": joblib.load("agents/score_agent/model/model_info/mlpClassifier_info/mlpClassifier_background.pkl")
+        "model": f"{MODEL_INFO_DIR}/mlpClassifier_info/mlpClassifier.pkl",
+        "preprocessor": f"{MODEL_INFO_DIR}/mlpClassifier_info/mlpClassifier_preprocessor.pkl",
+        "metrics": f"{MODEL_INFO_DIR}/mlpClassifier_info/mlpClassifier_metrics.json",
+        "background": f"{MODEL_INFO_DIR}/mlpClassifier_info/mlpClassifier_background.pkl",
+        "arrays": f"{MODEL_INFO_DIR}/mlpClassifier_info/arrays"
+    },
+    # tree model: served from the pickles (no compiled kernel / arrays), explained with TreeSHAP
+    "histGradientBoosting": {
+        "model": f"{MODEL_INFO_DIR}/histGradientBoosting_info/histGradientBoosting.pkl",
+        "preprocessor": f"{MODEL_INFO_DIR}/histGradientBoosting_info/histGradientBoosting_preprocessor.pkl",
+        "metrics": f"{MODEL_INFO_DIR}/histGradientBoosting_info/histGradientBoosting_metrics.json",
+        "background": f"{MODEL_INFO_DIR}/histGradientBoosting_info/histGradientBoosting_background.pkl"
     }
     ##Add thenura's model
 }
 
-# Pick the best model by accuracy
-best_model_name = max(models_info, key=lambda name: models_info[name]["metrics"]["accuracy"])
-best_model = models_info[best_model_name]["model"]
-best_preprocessor = models_info[best_model_name].get("preprocessor", None)
-best_metrics = models_info[best_model_name]["metrics"]
-best_background = models_info[best_model_name].get("background", None)
+_loaded_bundles = {}
+_bundles_lock = threading.Lock()
 
 
-print(f"Using best model: {best_model_name} (Accuracy: {best_metrics['accuracy']:.4f})")
+def load_model(name: str) -> ModelBundle:
+    """Loads one models_info model once (artifacts, compiled kernel, explainers)."""
+    with _bundles_lock:
+        if name not in _loaded_bundles:
+            bundle = ModelBundle.load(name, models_info[name], "model_info", SCORE_ARTIFACTS, SCORE_INFERENCE)
+            STARTUP_TIMINGS.setdefault(f"load:{name}", bundle.load_ms)
+            _loaded_bundles[name] = bundle
+        return _loaded_bundles[name]
 
-# Precompute SHAP explainer for MLP to speed up requests
-mlp_explainer = None
-if best_model_name == "mlpClassifier" and best_background is not None:
-    mlp_explainer = shap.KernelExplainer(best_model.predict_proba, best_background)
 
+def _load_metrics() -> dict:
+    # metrics files are tiny; models without one or without their model artifacts (not trained yet) are not candidates
+    metrics = {}
+    for name, paths in models_info.items():
+        servable = (os.path.exists(paths["model"]) and os.path.exists(paths["preprocessor"])) or \
+            ("arrays" in paths and os.path.exists(os.path.join(paths["arrays"], LAYOUT_FILE)))
+        if os.path.exists(paths["metrics"]) and servable:
+            with open(paths["metrics"]) as f:
+                metrics[name] = json.load(f)
+    return metrics
 
-#####after done training models must check which gets the highjest accuracy and then get the one with highest accuracy
 
-def score_applicant(applicant_data: dict):
-    # Convert applicant dictionary to a DataFrame
-    applicant_df = pd.DataFrame([applicant_data])
+def _attach_pool(bundle: ModelBundle):
+    if SCORE_SHAP_WORKERS > 0 and bundle.mlp_explainer is not None:
+        bundle.explainer_pool = ExplainerPool(
+            SCORE_SHAP_WORKERS,
+            SCORE_SHAP_MAX_PENDING,
+            # workers memory-map the same arrays when they exist
+            model_path=bundle.arrays_dir or bundle.paths["model"],
+            background_path=bundle.paths.get("background"),
+            # every tier, so a request for a non-default one does not build its explainer in the worker
+            warm_tiers=tuple(tier for tier, cfg in EXPLAIN_TIERS.items() if cfg is not None),
+        )
 
-    # Clean columns
-    applicant_df.columns = applicant_df.columns.str.strip()
-    for col in applicant_df.select_dtypes(include='object').columns:
-        applicant_df[col] = applicant_df[col].str.strip()
 
-   # Transform using preprocessor (handles encoding + scaling)
-    applicant_transformed = best_preprocessor.transform(applicant_df)
+def _load_registry_version(manifest: dict) -> ModelBundle:
+    verify_manifest(manifest, SCORE_REGISTRY_DIR)
+    return ModelBundle.load(manifest["model_name"], manifest_paths(manifest, SCORE_REGISTRY_DIR),
+                            f"registry:{manifest['version']}", SCORE_ARTIFACTS, SCORE_INFERENCE,
+                            version=manifest["version"])
 
-    # Predict
-    prob = best_model.predict_proba(applicant_transformed)[:, 1][0]
-    pred = best_model.predict(applicant_transformed)[0]
 
-    #To get the score out of 100
-    score = round(prob * 100, 2)
+with _timed("select:model"):
+    registry_manifest = active_manifest(SCORE_REGISTRY_DIR)
+    # Pick the best model by accuracy (models_info fallback when the registry is empty or broken)
+    all_metrics = _load_metrics()
+    best_model_name = max(all_metrics, key=lambda name: all_metrics[name]["accuracy"])
+    # accuracies are only comparable on the same test rows (python -m agents.score_agent.model.train)
+    _split_keys = {name: (m.get("split") or {}).get("key") for name, m in all_metrics.items()}
+    if len(set(_split_keys.values())) > 1:
+        print(f"WARNING: models were evaluated on different test splits {_split_keys}; "
+              "retrain them together with python -m agents.score_agent.model.train")
 
-     # SHAP explanation
-    shap_dict = {}
+active_bundle = None
+if registry_manifest is not None:
     try:
-        if best_model_name == "logisticRegression":
-            explainer = shap.LinearExplainer(best_model, best_background)
-            shap_values = explainer.shap_values(applicant_transformed)
-        elif best_model_name == "mlpClassifier":
-            if mlp_explainer is None:
-                print("No background data for SHAP. Skipping SHAP values.")
-                shap_values = None
-            else:
-                shap_values = mlp_explainer.shap_values(applicant_transformed)
-        else:
-            shap_values = None
-
-            # Get feature names
-        try:
-            feature_names = best_preprocessor.get_feature_names_out()
-        except:
-            feature_names = applicant_df.columns
+        active_bundle = _load_registry_version(registry_manifest)
+        STARTUP_TIMINGS[f"load:{registry_manifest['version']}"] = active_bundle.load_ms
+    except Exception as e:
+        print(f"Registry version {registry_manifest['version']} failed to load, using models_info: {e}")
+        registry_manifest = None
+if active_bundle is None:
+    if SCORE_STARTUP_MODE == "full":
+        for _name in all_metrics:
+            load_model(_name)
+    active_bundle = load_model(best_model_name)
+if active_bundle.compile_ms:
+    STARTUP_TIMINGS["compile:kernel"] = active_bundle.compile_ms
+_attach_pool(active_bundle)
 
-        # Convert SHAP to dict
-        shap_dict = {}
-        if shap_values is not None:
-            shap_list = shap_values[1][0] if isinstance(shap_values, list) and len(shap_values) == 2 else shap_values[0]
-            for col, val in zip(feature_names, shap_list):
-                shap_value = float(np.array(val).flatten()[0])
-                shap_dict[col] = round(shap_value, 4)
+print(f"Using best model: {active_bundle.name} (Accuracy: {active_bundle.metrics['accuracy']:.4f}, "
+      f"version {active_bundle.version}, {active_bundle.artifact_format} artifacts, {active_bundle.source})")
+
+# Result cache for /score (SCORE_CACHE_SIZE=0 disables, SCORE_CACHE_REDIS_URL shares it between workers).
+# Keys include the model name + artifact version, so entries die with the model that produced them.
+result_cache = build_cache()
 
 
+def _warm_explainer(bundle: ModelBundle):
+    # every tier, so a request for a non-default tier does not pay for building its explainer either
+    with _timed("warmup:explainer"):
+        if bundle.mlp_explainer is not None:
+            bundle.mlp_explainer.warm()
+        if bundle.tree_explainer is not None:
+            bundle.tree_explainer.warm()
+
+
+if SCORE_WARMUP == "eager" and active_bundle.explainer_pool is None and \
+        (active_bundle.mlp_explainer is not None or active_bundle.tree_explainer is not None):
+    _warm_explainer(active_bundle)
+
+
+def _swap_in(manifest: dict):
+    """Registry watcher callback: load + warm the new version off the request path, then swap."""
+    global active_bundle
+    bundle = _load_registry_version(manifest)
+    _attach_pool(bundle)
+    if bundle.explainer_pool is not None:
+        for f in bundle.explainer_pool.warm():
+            f.result()
+    bundle.warm(explain=DEFAULT_EXPLAIN_TIER != "none")
+
+    old, active_bundle = active_bundle, bundle  # requests already running keep their reference to `old`
+    print(f"Swapped model {old.version} -> {bundle.version} (load {bundle.load_ms} ms, warm {bundle.warm_ms} ms)")
+    # keys carry the version, so old entries can never be served; this only frees the memory
+    if isinstance(result_cache, InMemoryCache):
+        result_cache.clear()
+    if old.explainer_pool is not None:
+        old.explainer_pool.shutdown(cancel=False)
+
+
+# polling a missing or empty registry is a cheap listdir, so the first publish is picked up too
+registry_watcher = RegistryWatcher(SCORE_REGISTRY_DIR, _swap_in,
+                                   registry_manifest["version"] if registry_manifest is not None else None,
+                                   SCORE_REGISTRY_POLL_S)
+
+STARTUP_TIMINGS["import:total"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000.0, 2)
+print("Startup timings (ms):", STARTUP_TIMINGS)
+if SCORE_IMPORT_BUDGET_MS and STARTUP_TIMINGS["import:total"] > SCORE_IMPORT_BUDGET_MS:
+    print(f"WARNING: score agent import took {STARTUP_TIMINGS['import:total']} ms "
+          f"(budget {SCORE_IMPORT_BUDGET_MS} ms)")
+
+
+#####after done training models must check which gets the highjest accuracy and then get the one with highest accuracy
+
+def _shap_matrix(bundle: ModelBundle, applicant_transformed, tier: str):
+    """
+    SHAP values for the positive class as an (n_rows, n_features) array (None when unavailable),
+    plus a report of the tier used and its latency.
+    """
+    info = {"tier": tier, "latency_ms": 0.0}
+    if EXPLAIN_TIERS.get(tier) is None:
+        return None, info
+
+    if bundle.name == "logisticRegression":
+        if bundle.linear_explainer is None:
+            print("No feature means for linear SHAP. Skipping SHAP values.")
+            return None, info
+        start = time.perf_counter()
+        shap_values = bundle.linear_explainer.shap_values(applicant_transformed)
+        info["latency_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        info["complete"] = True
+        return shap_values, info
+    elif bundle.name == "mlpClassifier":
+        if bundle.mlp_explainer is None:
+            print("No background data for SHAP. Skipping SHAP values.")
+            return None, info
+        if bundle.explainer_pool is not None:
+            return _explain_in_pool(bundle.explainer_pool, applicant_transformed, tier, info)
+        return bundle.mlp_explainer.explain(applicant_transformed, tier)
+    elif bundle.tree_explainer is not None:
+        # exact TreeSHAP is cheap enough for every tier
+        start = time.perf_counter()
+        shap_values = bundle.tree_explainer.shap_values(applicant_transformed)
+        info["latency_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        info["complete"] = True
+        return shap_values, info
+    return None, info
+
+
+def _explain_in_pool(explainer_pool: ExplainerPool, applicant_transformed, tier: str, info: dict):
+    # predictions never wait on the pool: overload or a missed deadline just drops the SHAP values
+    future = explainer_pool.submit(applicant_transformed, tier)
+    if future is None:
+        info["skipped"] = "overload"
+        return None, info
+    try:
+        return future.result(timeout=EXPLAIN_TIERS[tier]["budget_ms"] / 1000.0 + SCORE_SHAP_GRACE_S)
+    except TimeoutError:
+        # a still-queued explanation is dropped so it stops holding a max_pending slot
+        future.cancel()
+        info["skipped"] = "timeout"
+        return None, info
+
+
+def _shap_dicts(bundle: ModelBundle, records: list, applicant_transformed, tier: str):
+    """One {feature: shap_value} dict per row (empty when SHAP fails or ran out of budget), plus the tier report."""
+    n_rows = len(records)
+    info = {"tier": tier, "latency_ms": 0.0}
+    try:
+        shap_values, info = _shap_matrix(bundle, applicant_transformed, tier)
+        if shap_values is None:
+            return [{} for _ in range(n_rows)], info
+
+        # Convert SHAP to dict
+        feature_names = bundle.feature_names(records)
+        return [
+            {col: round(float(val), 4) for col, val in zip(feature_names, row)} if np.isfinite(row).all() else {}
+            for row in shap_values
+        ], info
     except Exception as e:
         import traceback
         print("SHAP computation error:", e)
         traceback.print_exc()
-        shap_dict = {}
+        info["error"] = str(e)
+        return [{} for _ in range(n_rows)], info
 
-   
-    return {
-        "model_used": best_model_name,
-        "prediction": "Approved" if pred == 1 else "Rejected",
+
+def _predict_rows(records: list) -> list:
+    """Batch function for the micro-batcher: (bundle, transformed row, probability, prediction) per record."""
+    bundle = active_bundle
+    applicant_transformed = bundle.transform(records)
+    probs, preds = bundle.predict(applicant_transformed)
+    return [(bundle, applicant_transformed[i:i + 1], probs[i:i + 1], preds[i:i + 1]) for i in range(len(records))]
+
+
+# Opt-in request coalescing: concurrent /score calls arriving within SCORE_BATCH_WINDOW_MS
+# (or until SCORE_BATCH_MAX_ROWS are waiting) share one transform + predict_proba call.
+SCORE_BATCH_WINDOW_MS = float(os.getenv("SCORE_BATCH_WINDOW_MS", "0"))
+SCORE_BATCH_MAX_ROWS = int(os.getenv("SCORE_BATCH_MAX_ROWS", "64"))
+SCORE_BATCH_TIMEOUT_S = float(os.getenv("SCORE_BATCH_TIMEOUT_S", "30"))  # a /score call gives up (503) after this
+micro_batcher = MicroBatcher(_predict_rows, SCORE_BATCH_MAX_ROWS, SCORE_BATCH_WINDOW_MS,
+                             SCORE_BATCH_TIMEOUT_S) if SCORE_BATCH_WINDOW_MS > 0 else None
+
+# Shadow scoring: the models_info challengers in SCORE_SHADOW_MODELS (comma separated) score every
+# uncached request in a background thread; agreement + latency go to the SCORE_SHADOW_LOG NDJSON file.
+# At most SCORE_SHADOW_QUEUE requests wait for the challengers, beyond that shadow work is dropped.
+SCORE_SHADOW_MODELS = [m.strip() for m in os.getenv("SCORE_SHADOW_MODELS", "").split(",") if m.strip()]
+SCORE_SHADOW_LOG = os.getenv("SCORE_SHADOW_LOG", "logs/score_shadow.ndjson")
+SCORE_SHADOW_QUEUE = int(os.getenv("SCORE_SHADOW_QUEUE", "1000"))
+shadow_scorer = None
+if SCORE_SHADOW_MODELS:
+    unknown = [m for m in SCORE_SHADOW_MODELS if m not in models_info]
+    if unknown:
+        print(f"Ignoring unknown shadow models: {unknown}")
+    challengers = [load_model(m) for m in SCORE_SHADOW_MODELS if m in models_info]
+    if challengers:
+        shadow_scorer = ShadowScorer(challengers, SCORE_SHADOW_LOG, SCORE_SHADOW_QUEUE)
+        print(f"Shadow scoring with {[b.name for b in challengers]} -> {SCORE_SHADOW_LOG}")
+
+
+def score_applicant(applicant_data: dict, explain: str | None = None):
+    tier = explain or DEFAULT_EXPLAIN_TIER
+    # one bundle for the whole request, even if a reload swaps the active one meanwhile
+    bundle = active_bundle
+    cache_key = None
+    if result_cache is not None:
+        cache_key = canonical_key(applicant_data, bundle.name, bundle.version, tier)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    records = [applicant_data]
+
+    # Predict (coalesced with concurrent requests when micro-batching is on)
+    start = time.perf_counter()
+    if micro_batcher is not None:
+        try:
+            batch_bundle, applicant_transformed, probs, preds = micro_batcher.submit(applicant_data)
+        except TimeoutError:
+            raise HTTPException(status_code=503, detail="scoring timed out waiting for its batch")
+        if batch_bundle is not bundle and cache_key is not None:
+            cache_key = canonical_key(applicant_data, batch_bundle.name, batch_bundle.version, tier)
+        bundle = batch_bundle
+    else:
+        applicant_transformed = bundle.transform(records)
+        probs, preds = bundle.predict(applicant_transformed)
+    if shadow_scorer is not None:
+        shadow_scorer.offer(bundle, records, probs, preds, (time.perf_counter() - start) * 1000.0)
+
+    #To get the score out of 100
+    score = round(float(probs[0]) * 100, 2)
+
+     # SHAP explanation
+    shap_rows, explanation = _shap_dicts(bundle, records, applicant_transformed, tier)
+
+    response = {
+        "model_used": bundle.name,
+        "prediction": "Approved" if preds[0] == 1 else "Rejected",
         "score": score,
-        "model_metrics": {
-            "accuracy": best_metrics.get("accuracy"),
-            "precision": best_metrics.get("precision"),
-            "recall": best_metrics.get("recall"),
-            "f1_score": best_metrics.get("f1_score"),
-            "roc_auc": best_metrics.get("roc_auc")
-        },
-        "shap_values": shap_dict
+        "model_metrics": bundle.model_metrics(),
+        "shap_values": shap_rows[0],
+        "explanation": explanation
     }
+    # degraded answers (SHAP skipped, failed or cut by the budget) are not worth keeping
+    if cache_key is not None and "skipped" not in explanation and "error" not in explanation \
+            and explanation.get("complete", True):
+        result_cache.set(cache_key, response)
+    return response
+
+
+def score_applicants(applicants: list, with_shap: bool = False, explain: str | None = None):
+    """Scores many applicants with one preprocessor.transform and one predict_proba call."""
+    bundle = active_bundle
+    if not applicants:
+        return {"model_used": bundle.name, "model_metrics": bundle.model_metrics(), "count": 0, "results": []}
+
+    start = time.perf_counter()
+    applicant_transformed = bundle.transform(applicants)
+    probs, preds = bundle.predict(applicant_transformed)
+    if shadow_scorer is not None:
+        shadow_scorer.offer(bundle, applicants, probs, preds, (time.perf_counter() - start) * 1000.0)
+
+    shap_rows, explanation = None, None
+    if with_shap:
+        shap_rows, explanation = _shap_dicts(bundle, applicants, applicant_transformed, explain or DEFAULT_EXPLAIN_TIER)
+
+    results = []
+    for i in range(len(applicants)):
+        row = {
+            "prediction": "Approved" if preds[i] == 1 else "Rejected",
+            "score": round(float(probs[i]) * 100, 2),
+        }
+        if shap_rows is not None:
+            row["shap_values"] = shap_rows[i]
+        results.append(row)
+
+    response = {
+        "model_used": bundle.name,
+        "model_metrics": bundle.model_metrics(),
+        "count": len(results),
+        "results": results
+    }
+    if explanation is not None:
+        response["explanation"] = explanation
+    return response
+
+
+def _parse_batch_body(body: bytes, content_type: str) -> list:
+    """Accepts a JSON array (or {"applicants": [...]}) or NDJSON (one applicant object per line)."""
+    text = body.decode("utf-8").strip()
+    if not text:
+        return []
+
+    if "ndjson" in content_type or "jsonlines" in content_type or not text.startswith(("[", "{")):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        # several objects on separate lines sent without an NDJSON content type
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    if isinstance(data, dict):
+        data = data.get("applicants", [data])
+    return data
 
 
 ###From here we get the applicant data of ravidu aiyya. it calls the function above
 
+def _check_tier(explain: str | None):
+    if explain is not None and explain not in EXPLAIN_TIERS:
+        raise HTTPException(status_code=400, detail=f"explain must be one of {sorted(EXPLAIN_TIERS)}")
+
+
 @app.post("/score")         ####ravidu aiyyas applicant data comes here
-def score_endpoint(applicant: dict):
-    return score_applicant(applicant)
+def score_endpoint(applicant: dict, explain: str | None = None):
+    _check_tier(explain)
+    return score_applicant(applicant, explain)
+
+
+@app.post("/score/batch")
+async def score_batch_endpoint(request: Request, shap_values: bool = False, explain: str | None = None):
+    _check_tier(explain)
+    try:
+        applicants = _parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"invalid batch body: {e}")
+    if not isinstance(applicants, list) or not all(isinstance(a, dict) for a in applicants):
+        raise HTTPException(status_code=400, detail="expected a JSON array or NDJSON of applicant objects")
+
+    # the model work is CPU bound, keep it off the event loop
+    return await run_in_threadpool(score_applicants, applicants, shap_values, explain)
+
+
+@app.get("/score/stats")
+def score_stats():
+    bundle = active_bundle
+    return {
+        "model_used": bundle.name,
+        "model_version": bundle.version,
+        "artifacts": bundle.artifact_format,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "explainer_pool": bundle.explainer_pool.stats() if bundle.explainer_pool is not None else None,
+        "micro_batching": micro_batcher.stats() if micro_batcher is not None else None,
+        "shadow": shadow_scorer.stats() if shadow_scorer is not None else None,
+    }
+
+
+@app.get("/model")
+def model_info():
+    """Active model version, where it came from and how long it took to load and warm."""
+    return {
+        "active": active_bundle.describe(),
+        "registry": registry_watcher.stats(),
+    }
+
+
+@app.post("/model/reload")
+def model_reload():
+    """Checks the registry now instead of waiting for the next poll."""
+    swapped = registry_watcher.check()
+    return {"swapped": swapped, "active": active_bundle.describe(), "registry": registry_watcher.stats()}
+
+
+@app.get("/startup")
+def startup_report():
+    """Where import / warm-up time went, in milliseconds."""
+    return {
+        "model_used": active_bundle.name,
+        "startup_mode": SCORE_STARTUP_MODE,
+        "warmup": SCORE_WARMUP,
+        "loaded_models": sorted(_loaded_bundles),
+        "timings_ms": STARTUP_TIMINGS,
+    }
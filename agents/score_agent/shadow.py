@@ -0,0 +1,97 @@
+"""
+Shadow scoring: challenger models score the same input as the champion, off the request path.
+
+The request thread only does a non-blocking put on a bounded queue (the work is dropped when
+the queue is full). A single worker thread runs the challengers and appends one compact NDJSON
+line per request and challenger:
+
+    {"ts": 1760000000.123, "champion": "mlpClassifier@b979...", "challenger": "logisticRegression@0889...",
+     "rows": 1, "agree": 1, "champion_ms": 0.05, "challenger_ms": 0.04, "max_score_diff": 3.1}
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from agents.score_agent.batching import Histogram
+
+_LATENCY_BOUNDS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100]
+
+
+class ShadowScorer:
+    def __init__(self, challengers: list, log_path: str, max_queue: int = 1000):
+        self.challengers = challengers          # ModelBundles
+        self.log_path = log_path
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self.offered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.champion_ms = Histogram(_LATENCY_BOUNDS_MS)
+        self.challenger_ms = {b.name: Histogram(_LATENCY_BOUNDS_MS) for b in challengers}
+        self.agreement = {b.name: [0, 0] for b in challengers}  # [rows agreeing, rows compared]
+        log_dir = os.path.dirname(log_path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        self._log = open(log_path, "a", buffering=1)  # line buffered: every record lands as a full line
+        self._worker = threading.Thread(target=self._run, name="score-shadow", daemon=True)
+        self._worker.start()
+
+    def offer(self, champion, records: list, probs, preds, champion_ms: float):
+        """Called on the request path: never blocks, drops the work when the queue is full."""
+        self.offered += 1
+        try:
+            self._queue.put_nowait((champion.name, champion.version, records,
+                                    np.array(probs, dtype=float), np.array(preds), champion_ms))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            champion_name, champion_version, records, probs, preds, champion_ms = self._queue.get()
+            self.champion_ms.observe(champion_ms)
+            for bundle in self.challengers:
+                if bundle.name == champion_name:
+                    continue
+                try:
+                    start = time.perf_counter()
+                    c_probs, c_preds = bundle.predict(bundle.transform(records))
+                    latency_ms = (time.perf_counter() - start) * 1000.0
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Shadow scoring with {bundle.name} failed: {e}")
+                    continue
+                agree = int(np.sum(np.asarray(c_preds) == preds))
+                self.challenger_ms[bundle.name].observe(latency_ms)
+                self.agreement[bundle.name][0] += agree
+                self.agreement[bundle.name][1] += len(records)
+                self._log.write(json.dumps({
+                    "ts": round(time.time(), 3),
+                    "champion": f"{champion_name}@{champion_version}",
+                    "challenger": f"{bundle.name}@{bundle.version}",
+                    "rows": len(records),
+                    "agree": agree,
+                    "champion_ms": round(champion_ms, 3),
+                    "challenger_ms": round(latency_ms, 3),
+                    "max_score_diff": round(float(np.max(np.abs(np.asarray(c_probs) - probs))) * 100, 2),
+                }, separators=(",", ":")) + "\n")
+
+    def stats(self) -> dict:
+        return {
+            "log": self.log_path,
+            "queued": self._queue.qsize(),
+            "offered": self.offered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "champion_ms": self.champion_ms.to_dict(),
+            "challengers": {
+                name: {
+                    "agreement": round(agree / total, 4) if total else None,
+                    "rows": total,
+                    "latency_ms": self.challenger_ms[name].to_dict(),
+                }
+                for name, (agree, total) in self.agreement.items()
+            },
+        }